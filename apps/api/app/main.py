@@ -1,14 +1,83 @@
+import asyncio
+import logging
+import os
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 
 from apps.api.app.routers.auth_google import router as auth_google_router
 from apps.api.app.routers.health import router as health_router
 from apps.api.app.routers.memory import router as memory_router
 from apps.api.app.routers.requests import router as requests_router
 from apps.api.app.routers.webhooks import router as webhooks_router
+from apps.api.app.services.dedupe import get_webhook_deduper
+from apps.api.app.services.waha_client import WahaClient
+from packages.agent_core.tools.calendar_tool import flush_tool_runs
+from packages.db.database import async_engine
+
+logger = logging.getLogger(__name__)
+
+SEND_QUEUE_SIZE = 1000
+SEND_WORKERS = 4
+SEND_DRAIN_TIMEOUT_SECONDS = 10
 
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 app.include_router(auth_google_router)
 app.include_router(health_router)
 app.include_router(memory_router)
 app.include_router(requests_router)
 app.include_router(webhooks_router)
+
+
+async def _send_worker(queue: asyncio.Queue) -> None:
+    while True:
+        func, args = await queue.get()
+        try:
+            await func(*args)
+        except Exception as exc:  # pragma: no cover - best-effort logging
+            logger.warning("Send job failed: %s", exc.__class__.__name__)
+        finally:
+            queue.task_done()
+
+
+@app.on_event("startup")
+async def on_startup() -> None:
+    app.state.waha_client = WahaClient()
+    app.state.deduper = get_webhook_deduper()
+    app.state.send_queue = asyncio.Queue(maxsize=SEND_QUEUE_SIZE)
+    app.state.send_workers = [
+        asyncio.create_task(_send_worker(app.state.send_queue)) for _ in range(SEND_WORKERS)
+    ]
+    app.state.scheduler = None
+    if os.getenv("API_SCHEDULER") == "1":
+        from apps.worker.app.main import register_jobs
+        from apps.worker.app.proactive import TIMEZONE, run_daily_digest, run_proactive_tick
+
+        async def proactive_tick_job() -> None:
+            await asyncio.to_thread(run_proactive_tick)
+
+        async def daily_digest_job() -> None:
+            await asyncio.to_thread(run_daily_digest)
+
+        scheduler = AsyncIOScheduler(timezone=TIMEZONE)
+        register_jobs(scheduler, tick=proactive_tick_job, digest=daily_digest_job)
+        scheduler.start()
+        app.state.scheduler = scheduler
+
+
+@app.on_event("shutdown")
+async def on_shutdown() -> None:
+    if app.state.scheduler is not None:
+        app.state.scheduler.shutdown(wait=False)
+    try:
+        await asyncio.wait_for(app.state.send_queue.join(), timeout=SEND_DRAIN_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        logger.warning("Send queue not drained; %s jobs dropped", app.state.send_queue.qsize())
+    for task in app.state.send_workers:
+        task.cancel()
+    await asyncio.gather(*app.state.send_workers, return_exceptions=True)
+    await app.state.waha_client.aclose()
+    await app.state.deduper.aclose()
+    await asyncio.to_thread(flush_tool_runs)
+    await async_engine.dispose()
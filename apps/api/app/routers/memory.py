@@ -38,7 +38,7 @@ def memory_search(
             "content": chunk.content,
             "tags": chunk.tags,
             "topic": chunk.topic,
-            "created_at": chunk.created_at.isoformat(),
+            "created_at": chunk.created_at,
         }
         for chunk in chunks
     ]
@@ -1,154 +1,208 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
+import time
 from datetime import datetime, timezone
 from typing import Any
 
-from fastapi import APIRouter, BackgroundTasks
+from fastapi import APIRouter, Request
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
-from apps.api.app.services.waha_client import WahaClient
+from apps.api.app.services.dedupe import payload_dedupe_key
+from apps.api.app.services.waha_client import WahaClient, outbound_raw_payload
 from apps.api.app.services.webhook_service import extract_message_fields
 from packages.agent_core.core import handle_incoming_message
-from packages.db.database import SessionLocal
+from packages.db.database import AsyncSessionLocal, SessionLocal, on_commit_flag
 from packages.db.models import Contact, MemoryFact, MessageRaw
-from packages.relations.contact_handler import handle_contact_inbound, send_contact_reply
+from packages.relations.contact_handler import (
+    ContactInboundResult,
+    handle_contact_inbound,
+    send_contact_reply,
+)
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+USER_CHAT_ID_CACHE_TTL_SECONDS = 60
+_USER_CHAT_ID = os.getenv("USER_CHAT_ID")
+_user_chat_id_cache: tuple[float, str | None] | None = None
+
+
+def invalidate_user_chat_id_cache() -> None:
+    global _user_chat_id_cache
+    _user_chat_id_cache = None
 
-def _upsert_contact(session, chat_id: str, display_name: str | None) -> None:
-    contact = session.query(Contact).filter_by(chat_id=chat_id).one_or_none()
-    if contact is None:
-        contact = Contact(chat_id=chat_id, display_name=display_name)
-        session.add(contact)
-        contact.last_interaction_at = datetime.now(timezone.utc)
-        return
 
-    if display_name and contact.display_name != display_name:
-        contact.display_name = display_name
-    contact.last_interaction_at = datetime.now(timezone.utc)
+on_commit_flag("user_chat_id_changed", invalidate_user_chat_id_cache)
+
+
+def _upsert_contact(session, chat_id: str, display_name: str | None) -> None:
+    now = datetime.now(timezone.utc)
+    stmt = pg_insert(Contact.__table__).values(
+        chat_id=chat_id,
+        display_name=display_name,
+        last_interaction_at=now,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[Contact.__table__.c.chat_id],
+        set_={
+            "display_name": func.coalesce(stmt.excluded.display_name, Contact.__table__.c.display_name),
+            "last_interaction_at": now,
+            "updated_at": func.now(),
+        },
+    )
+    session.execute(stmt)
 
 
 def _resolve_user_chat_id(session) -> str | None:
-    explicit = os.getenv("USER_CHAT_ID")
-    if explicit:
-        return explicit
+    global _user_chat_id_cache
+    if _USER_CHAT_ID:
+        return _USER_CHAT_ID
+    cached = _user_chat_id_cache
+    if cached and time.monotonic() - cached[0] < USER_CHAT_ID_CACHE_TTL_SECONDS:
+        return cached[1]
     fact = (
-        session.query(MemoryFact)
-        .filter(
-            MemoryFact.subject == "user",
-            MemoryFact.key == "user_chat_id",
-            MemoryFact.confidence >= 70,
+        session.execute(
+            select(MemoryFact).where(
+                MemoryFact.subject == "user",
+                MemoryFact.key == "user_chat_id",
+                MemoryFact.confidence >= 70,
+            )
         )
-        .one_or_none()
-    )
-    if fact:
-        return fact.value
-    return None
+    ).scalar_one_or_none()
+    value = fact.value if fact else None
+    _user_chat_id_cache = (time.monotonic(), value)
+    return value
 
 
-def _send_reply_and_store(chat_id: str, text: str) -> None:
-    client = WahaClient()
+async def _send_reply_and_store(client: WahaClient, chat_id: str, text: str) -> None:
     response_payload: dict[str, Any] | None = None
     error: str | None = None
 
     try:
-        response_payload = client.send_text(chat_id, text)
+        response_payload = await client.send_text_async(chat_id, text)
     except Exception as exc:  # pragma: no cover - best-effort logging
         logger.warning("WAHA send_text failed: %s", exc.__class__.__name__)
         error = str(exc)
 
-    raw_payload: dict[str, Any] = {
-        "request": {"chatId": chat_id, "text": text},
-        "response": response_payload,
-    }
-    if error:
-        raw_payload["error"] = error
-
-    with SessionLocal() as session:
-        outbound = MessageRaw(
-            direction="outbound",
-            platform="whatsapp",
-            chat_id=chat_id,
-            sender_id=None,
-            body=text,
-            raw_payload=raw_payload,
+    async with AsyncSessionLocal() as session:
+        await session.execute(
+            insert(MessageRaw.__table__).values(
+                direction="outbound",
+                platform="whatsapp",
+                chat_id=chat_id,
+                sender_id=None,
+                body=text,
+                raw_payload=outbound_raw_payload(response_payload, error),
+            )
         )
-        session.add(outbound)
-        session.commit()
+        await session.commit()
 
 
-@router.post("/webhooks/waha")
-def waha_webhook(payload: dict[str, Any], background_tasks: BackgroundTasks) -> dict:
-    chat_id, sender_id, body, display_name = extract_message_fields(payload)
-    resolved_chat_id = chat_id or "unknown"
-    message_body = body or ""
-
+def _record_inbound(
+    payload: dict[str, Any],
+    chat_id: str | None,
+    sender_id: str | None,
+    body: str,
+    display_name: str | None,
+) -> ContactInboundResult | None:
     with SessionLocal() as session:
-        inbound = MessageRaw(
-            direction="inbound",
-            platform="whatsapp",
-            chat_id=resolved_chat_id,
-            sender_id=sender_id,
-            body=message_body,
-            raw_payload=payload,
-        )
-        session.add(inbound)
-
-        if chat_id:
-            _upsert_contact(session, chat_id, display_name)
-        session.commit()
+        inbound_id = session.execute(
+            insert(MessageRaw.__table__)
+            .values(
+                direction="inbound",
+                platform="whatsapp",
+                chat_id=chat_id or "unknown",
+                sender_id=sender_id,
+                body=body,
+                raw_payload=payload,
+            )
+            .returning(MessageRaw.__table__.c.id)
+        ).scalar_one()
 
-    if not chat_id:
-        logger.warning("WAHA webhook missing chat_id")
-        return {"status": "ok"}
+        if not chat_id:
+            session.commit()
+            return None
 
-    with SessionLocal() as session:
+        _upsert_contact(session, chat_id, display_name)
         user_chat_id = _resolve_user_chat_id(session)
-        is_contact_message = user_chat_id is not None and chat_id != user_chat_id
-        inbound_id = inbound.id
-        now = datetime.now(timezone.utc)
-
-    if is_contact_message:
-        with SessionLocal() as session:
+        result = None
+        if user_chat_id is not None and chat_id != user_chat_id:
             result = handle_contact_inbound(
                 session=session,
                 chat_id=chat_id,
                 message_raw_id=inbound_id,
-                body=message_body,
+                body=body,
                 display_name=display_name,
                 user_chat_id=user_chat_id,
-                now=now,
+                now=datetime.now(timezone.utc),
             )
-            session.commit()
+        session.commit()
+    return result
+
+
+@router.post("/webhooks/waha")
+async def waha_webhook(payload: dict[str, Any], request: Request) -> dict:
+    deduper = request.app.state.deduper
+    key = payload_dedupe_key(payload)
+    if not await deduper.first_seen(key):
+        return {"status": "ok"}
+    try:
+        return await _process_webhook(payload, request)
+    except Exception:
+        await deduper.forget(key)
+        raise
+
+
+async def _process_webhook(payload: dict[str, Any], request: Request) -> dict:
+    waha_client: WahaClient = request.app.state.waha_client
+    send_queue: asyncio.Queue = request.app.state.send_queue
+
+    chat_id, sender_id, body, display_name = extract_message_fields(payload)
+    result = await run_in_threadpool(
+        _record_inbound, payload, chat_id, sender_id, body or "", display_name
+    )
+    if not chat_id:
+        logger.warning("WAHA webhook missing chat_id")
+        return {"status": "ok"}
 
+    if result is not None:
         if result.auto_reply_chat_id and result.auto_reply_text and result.thread_id:
-            background_tasks.add_task(
-                send_contact_reply,
-                result.thread_id,
-                result.auto_reply_chat_id,
-                result.auto_reply_text,
-                result.outbound_kind or "info",
-                {
-                    "decision_source": "supervisor",
-                    "requested_by": "worker",
-                    "risk_level": "medium",
-                    "autonomy_mode_snapshot": {},
-                },
+            await send_queue.put(
+                (
+                    run_in_threadpool,
+                    (
+                        send_contact_reply,
+                        result.thread_id,
+                        result.auto_reply_chat_id,
+                        result.auto_reply_text,
+                        result.outbound_kind or "info",
+                        {
+                            "decision_source": "supervisor",
+                            "requested_by": "worker",
+                            "risk_level": "medium",
+                            "autonomy_mode_snapshot": {},
+                        },
+                    ),
+                )
             )
 
         if result.notify_user_chat_id and result.notify_user_text:
-            background_tasks.add_task(
-                _send_reply_and_store,
-                result.notify_user_chat_id,
-                result.notify_user_text,
+            await send_queue.put(
+                (
+                    _send_reply_and_store,
+                    (waha_client, result.notify_user_chat_id, result.notify_user_text),
+                )
             )
         return {"status": "ok"}
 
-    agent_result = handle_incoming_message(
+    agent_result = await run_in_threadpool(
+        handle_incoming_message,
         chat_id=chat_id,
         sender_id=sender_id,
         text=body,
@@ -156,6 +210,6 @@ def waha_webhook(payload: dict[str, Any], background_tasks: BackgroundTasks) ->
         raw_payload=payload,
     )
     reply_text = agent_result.reply_text
-    background_tasks.add_task(_send_reply_and_store, chat_id, reply_text)
+    await send_queue.put((_send_reply_and_store, (waha_client, chat_id, reply_text)))
 
     return {"status": "ok"}
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import hashlib
+import logging
+import os
+import time
+from typing import Any, Protocol
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+DEDUPE_TTL_SECONDS = 300
+DEDUPE_MAX_ENTRIES = 10000
+
+
+class WebhookDeduper(Protocol):
+    async def first_seen(self, key: str) -> bool:
+        ...
+
+    async def forget(self, key: str) -> None:
+        ...
+
+    async def aclose(self) -> None:
+        ...
+
+
+class MemoryDeduper:
+    def __init__(self, ttl_seconds: int = DEDUPE_TTL_SECONDS, max_entries: int = DEDUPE_MAX_ENTRIES) -> None:
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._seen: dict[str, float] = {}
+
+    async def first_seen(self, key: str) -> bool:
+        now = time.monotonic()
+        expires_at = self._seen.get(key)
+        if expires_at is not None and expires_at > now:
+            return False
+        if len(self._seen) >= self.max_entries:
+            self._seen = {k: v for k, v in self._seen.items() if v > now}
+            while len(self._seen) >= self.max_entries:
+                self._seen.pop(next(iter(self._seen)))
+        self._seen[key] = now + self.ttl_seconds
+        return True
+
+    async def forget(self, key: str) -> None:
+        self._seen.pop(key, None)
+
+    async def aclose(self) -> None:
+        self._seen.clear()
+
+
+class RedisDeduper:
+    def __init__(self, url: str, ttl_seconds: int = DEDUPE_TTL_SECONDS) -> None:
+        import redis.asyncio as redis
+
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis.Redis.from_url(url)
+
+    async def first_seen(self, key: str) -> bool:
+        try:
+            return bool(await self._redis.set(f"waha:seen:{key}", 1, nx=True, ex=self.ttl_seconds))
+        except Exception as exc:  # pragma: no cover - best-effort logging
+            logger.warning("Redis dedupe failed: %s", exc.__class__.__name__)
+            return True
+
+    async def forget(self, key: str) -> None:
+        try:
+            await self._redis.delete(f"waha:seen:{key}")
+        except Exception as exc:  # pragma: no cover - best-effort logging
+            logger.warning("Redis dedupe forget failed: %s", exc.__class__.__name__)
+
+    async def aclose(self) -> None:
+        await self._redis.aclose()
+
+
+def get_webhook_deduper() -> WebhookDeduper:
+    url = os.getenv("REDIS_URL")
+    if url:
+        try:
+            return RedisDeduper(url)
+        except ImportError:
+            logger.warning("REDIS_URL set but redis is not installed; using in-process dedupe")
+    return MemoryDeduper()
+
+
+def payload_dedupe_key(payload: dict[str, Any]) -> str:
+    inner = payload.get("payload")
+    for candidate in (inner.get("id") if isinstance(inner, dict) else None, payload.get("id")):
+        if isinstance(candidate, str) and candidate:
+            return candidate
+    encoded = orjson.dumps(payload, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    return hashlib.blake2b(encoded, digest_size=16).hexdigest()
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 import logging
 import os
 import time
@@ -8,8 +9,18 @@ import httpx
 
 logger = logging.getLogger(__name__)
 
+_WAHA_BASE = (os.getenv("WAHA_BASE_URL") or "http://waha:3000").rstrip("/")
+_WAHA_KEY = os.getenv("WAHA_API_KEY")
+_WAHA_TIMEOUT = float(os.getenv("WAHA_TIMEOUT", "5"))
+_WAHA_RETRIES = int(os.getenv("WAHA_RETRIES", "2"))
+
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=40)
+_CONNECT_ERRORS = (httpx.ConnectError, httpx.ConnectTimeout)
+
 
 class WahaClient:
+    _client: httpx.Client | None = None
+
     def __init__(
         self,
         base_url: str | None = None,
@@ -17,39 +28,99 @@ class WahaClient:
         timeout: float | None = None,
         retries: int | None = None,
         session: str | None = None,
+        async_client: httpx.AsyncClient | None = None,
     ) -> None:
-        self.base_url = (base_url or os.getenv("WAHA_BASE_URL") or "http://waha:3000").rstrip(
-            "/"
-        )
-        self.api_key = api_key or os.getenv("WAHA_API_KEY")
-        self.timeout = timeout or float(os.getenv("WAHA_TIMEOUT", "5"))
-        self.retries = retries if retries is not None else int(os.getenv("WAHA_RETRIES", "2"))
+        self.base_url = base_url.rstrip("/") if base_url else _WAHA_BASE
+        self.api_key = api_key or _WAHA_KEY
+        self.timeout = timeout or _WAHA_TIMEOUT
+        self.retries = retries if retries is not None else _WAHA_RETRIES
         self.session = session or "default"
+        self._async_client = async_client
 
-    def send_text(self, chat_id: str, text: str) -> dict:
+    @classmethod
+    def _get_client(cls) -> httpx.Client:
+        if cls._client is None:
+            cls._client = httpx.Client(
+                transport=httpx.HTTPTransport(limits=_LIMITS)
+            )
+        return cls._client
+
+    def _build_request(self, chat_id: str, text: str) -> tuple[str, dict, dict]:
         url = f"{self.base_url}/api/sendText"
         payload = {"chatId": chat_id, "text": text, "session": self.session}
         headers = {}
         if self.api_key:
             headers["X-API-Key"] = self.api_key
+        return url, payload, headers
+
+    def _should_retry(self, response: httpx.Response | None, attempt: int, error: str) -> bool:
+        if attempt >= self.retries or (response is not None and response.status_code < 500):
+            return False
+        logger.warning(
+            "WAHA send_text failed (attempt %s/%s): %s", attempt + 1, self.retries + 1, error
+        )
+        return True
+
+    # Blocks on retries; async callers must use send_text_async.
+    def send_text(self, chat_id: str, text: str) -> dict:
+        url, payload, headers = self._build_request(chat_id, text)
+        client = self._get_client()
 
         for attempt in range(self.retries + 1):
             try:
-                response = httpx.post(url, json=payload, headers=headers, timeout=self.timeout)
-                response.raise_for_status()
-                try:
-                    return response.json()
-                except ValueError:
-                    return {"status_code": response.status_code, "text": response.text}
-            except (httpx.RequestError, httpx.HTTPStatusError) as exc:
-                logger.warning(
-                    "WAHA send_text failed (attempt %s/%s): %s",
-                    attempt + 1,
-                    self.retries + 1,
-                    exc.__class__.__name__,
-                )
-                if attempt >= self.retries:
+                response = client.post(url, json=payload, headers=headers, timeout=self.timeout)
+            except _CONNECT_ERRORS as exc:
+                if not self._should_retry(None, attempt, exc.__class__.__name__):
                     raise
                 time.sleep(0.3 * (attempt + 1))
+                continue
+            if self._should_retry(response, attempt, f"HTTP {response.status_code}"):
+                time.sleep(0.3 * (attempt + 1))
+                continue
+            response.raise_for_status()
+            return _response_payload(response)
+
+    async def send_text_async(self, chat_id: str, text: str) -> dict:
+        url, payload, headers = self._build_request(chat_id, text)
+        if self._async_client is None:
+            self._async_client = httpx.AsyncClient(
+                transport=httpx.AsyncHTTPTransport(limits=_LIMITS)
+            )
+
+        for attempt in range(self.retries + 1):
+            try:
+                response = await self._async_client.post(
+                    url, json=payload, headers=headers, timeout=self.timeout
+                )
+            except _CONNECT_ERRORS as exc:
+                if not self._should_retry(None, attempt, exc.__class__.__name__):
+                    raise
+                await asyncio.sleep(0.3 * (attempt + 1))
+                continue
+            if self._should_retry(response, attempt, f"HTTP {response.status_code}"):
+                await asyncio.sleep(0.3 * (attempt + 1))
+                continue
+            response.raise_for_status()
+            return _response_payload(response)
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+
+def _response_payload(response: httpx.Response) -> dict:
+    try:
+        return response.json()
+    except ValueError:
+        return {"status_code": response.status_code, "text": response.text}
+
 
-        return {"status": "unknown"}
+def outbound_raw_payload(response_payload: dict | None, error: str | None) -> dict:
+    message_id = (response_payload or {}).get("id")
+    if isinstance(message_id, dict):
+        message_id = message_id.get("_serialized") or message_id.get("id")
+    raw_payload = {"waha_message_id": message_id, "status": "error" if error else "sent"}
+    if error:
+        raw_payload["error"] = error
+    return raw_payload
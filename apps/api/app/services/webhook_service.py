@@ -1,98 +1,114 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import Any, Callable
+
+
+_COERCERS: dict[type, Callable[[Any], str | None]] = {
+    str: lambda value: value or None,
+    int: str,
+    float: str,
+    bool: str,
+}
 
 
 def _coerce_text(value: Any) -> str | None:
-    if value is None:
-        return None
-    if isinstance(value, str):
-        return value
-    if isinstance(value, (int, float, bool)):
-        return str(value)
-    return None
+    coercer = _COERCERS.get(type(value))
+    return coercer(value) if coercer else None
+
+
+_CHAT_ID_PATHS = (
+    ("payload", "chatId"),
+    ("payload", "chat_id"),
+    ("payload", "chat", "id"),
+    ("payload", "message", "chatId"),
+    ("payload", "message", "chat_id"),
+    ("payload", "from"),
+    ("payload", "chat"),
+    ("chatId",),
+    ("chat_id",),
+    ("chat", "id"),
+    ("from",),
+    ("chat",),
+)
+_SENDER_ID_PATHS = (
+    ("payload", "author"),
+    ("payload", "senderId"),
+    ("payload", "sender_id"),
+    ("payload", "sender", "id"),
+    ("payload", "sender"),
+    ("payload", "participant"),
+    ("author",),
+    ("senderId",),
+    ("sender_id",),
+    ("sender", "id"),
+)
+_TEXT_PATHS = (
+    ("payload", "body"),
+    ("payload", "text"),
+    ("payload", "message", "text"),
+    ("payload", "message", "body"),
+    ("payload", "message"),
+    ("payload", "caption"),
+    ("payload", "content"),
+    ("message", "text"),
+    ("message", "body"),
+    ("text",),
+    ("body",),
+    ("message",),
+)
+_DISPLAY_NAME_PATHS = (
+    ("payload", "senderName"),
+    ("payload", "pushName"),
+    ("payload", "notifyName"),
+    ("payload", "profileName"),
+    ("payload", "fromName"),
+    ("payload", "name"),
+    ("senderName",),
+    ("pushName",),
+    ("notifyName",),
+    ("profileName",),
+    ("fromName",),
+    ("name",),
+)
+
+
+def _as_dict(value: Any) -> dict[str, Any]:
+    return value if isinstance(value, dict) else {}
+
+
+def _compile_extractor(
+    fields: tuple[tuple[tuple[str, ...], ...], ...],
+) -> Callable[[Any], tuple[str | None, ...]]:
+    nodes: dict[tuple[str, ...], str] = {(): "node0"}
+    lines = ["def _extract(payload):", "    node0 = _as_dict(payload)"]
+    for paths in fields:
+        for path in paths:
+            for depth in range(1, len(path)):
+                prefix = path[:depth]
+                if prefix not in nodes:
+                    name = f"node{len(nodes)}"
+                    parent = nodes[prefix[:-1]]
+                    lines.append(f"    {name} = _as_dict({parent}.get({prefix[-1]!r}))")
+                    nodes[prefix] = name
 
+    values = []
+    for paths in fields:
+        terms = [f"_coerce_text({nodes[path[:-1]]}.get({path[-1]!r}))" for path in paths]
+        values.append("(" + " or ".join(terms) + " or None)")
+    lines.append("    return (" + ", ".join(values) + ")")
 
-def _get_path(payload: dict[str, Any], path: tuple[str, ...]) -> Any | None:
-    current: Any = payload
-    for key in path:
-        if not isinstance(current, dict) or key not in current:
-            return None
-        current = current[key]
-    return current
+    namespace: dict[str, Any] = {"_as_dict": _as_dict, "_coerce_text": _coerce_text}
+    exec(compile("\n".join(lines), "<webhook_extractor>", "exec"), namespace)
+    return namespace["_extract"]
 
 
-def _first_value(payload: dict[str, Any], paths: list[tuple[str, ...]]) -> str | None:
-    for path in paths:
-        value = _get_path(payload, path)
-        text_value = _coerce_text(value)
-        if text_value:
-            return text_value
-    return None
+_extract_compiled = _compile_extractor(
+    (_CHAT_ID_PATHS, _SENDER_ID_PATHS, _TEXT_PATHS, _DISPLAY_NAME_PATHS)
+)
 
 
 def extract_message_fields(payload: dict[str, Any]) -> tuple[str | None, str | None, str | None, str | None]:
-    chat_id_paths = [
-        ("payload", "chatId"),
-        ("payload", "chat_id"),
-        ("payload", "chat", "id"),
-        ("payload", "message", "chatId"),
-        ("payload", "message", "chat_id"),
-        ("payload", "from"),
-        ("payload", "chat"),
-        ("chatId",),
-        ("chat_id",),
-        ("chat", "id"),
-        ("from",),
-        ("chat",),
-    ]
-    sender_id_paths = [
-        ("payload", "author"),
-        ("payload", "senderId"),
-        ("payload", "sender_id"),
-        ("payload", "sender", "id"),
-        ("payload", "sender"),
-        ("payload", "participant"),
-        ("author",),
-        ("senderId",),
-        ("sender_id",),
-        ("sender", "id"),
-    ]
-    text_paths = [
-        ("payload", "body"),
-        ("payload", "text"),
-        ("payload", "message", "text"),
-        ("payload", "message", "body"),
-        ("payload", "message"),
-        ("payload", "caption"),
-        ("payload", "content"),
-        ("message", "text"),
-        ("message", "body"),
-        ("text",),
-        ("body",),
-        ("message",),
-    ]
-    display_name_paths = [
-        ("payload", "senderName"),
-        ("payload", "pushName"),
-        ("payload", "notifyName"),
-        ("payload", "profileName"),
-        ("payload", "fromName"),
-        ("payload", "name"),
-        ("senderName",),
-        ("pushName",),
-        ("notifyName",),
-        ("profileName",),
-        ("fromName",),
-        ("name",),
-    ]
-
-    chat_id = _first_value(payload, chat_id_paths)
-    sender_id = _first_value(payload, sender_id_paths)
-    body = _first_value(payload, text_paths)
-    display_name = _first_value(payload, display_name_paths)
-
-    return chat_id, sender_id, body, display_name
+    return _extract_compiled(payload)
 
 
 def build_reply_text(body: str | None) -> str:
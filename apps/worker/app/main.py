@@ -5,13 +5,12 @@ import logging
 from apscheduler.schedulers.blocking import BlockingScheduler
 
 from apps.worker.app.proactive import TIMEZONE, run_daily_digest, run_proactive_tick
+from packages.agent_core.tools.calendar_tool import flush_tool_runs
 
 
-def main() -> None:
-    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
-    scheduler = BlockingScheduler(timezone=TIMEZONE)
+def register_jobs(scheduler, tick=run_proactive_tick, digest=run_daily_digest) -> None:
     scheduler.add_job(
-        run_proactive_tick,
+        tick,
         "interval",
         minutes=2,
         id="proactive_tick",
@@ -19,7 +18,7 @@ def main() -> None:
         coalesce=True,
     )
     scheduler.add_job(
-        run_daily_digest,
+        digest,
         "cron",
         hour=21,
         minute=0,
@@ -27,7 +26,16 @@ def main() -> None:
         max_instances=1,
         coalesce=True,
     )
-    scheduler.start()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    scheduler = BlockingScheduler(timezone=TIMEZONE)
+    register_jobs(scheduler)
+    try:
+        scheduler.start()
+    finally:
+        flush_tool_runs()
 
 
 if __name__ == "__main__":
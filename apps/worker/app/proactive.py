@@ -1,21 +1,24 @@
 from __future__ import annotations
 
+from bisect import bisect_left
 from dataclasses import dataclass
 from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
 import logging
 import math
 import os
+from time import monotonic
 import unicodedata
 from typing import Iterable
 from zoneinfo import ZoneInfo
 
-from sqlalchemy import select
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy import func, inspect, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from apps.api.app.services.waha_client import WahaClient
 from packages.agent_core.tools.calendar_tool import CalendarNotAuthorized, CalendarTool
 from packages.agent_core.tools.google_oauth import OAuthConfigError
-from packages.db.database import SessionLocal
+from packages.db.database import SessionLocal, on_commit_flag
 from packages.db.models import (
     AssistantRequest,
     AutonomyRule,
@@ -36,9 +39,15 @@ from packages.habits.selector import NudgeStrategySelector
 from packages.llm.client import load_llm_config
 from packages.llm.text_client import TextLlmClient
 
+try:
+    from ciso8601 import parse_datetime as _parse_iso
+except ImportError:
+    _parse_iso = datetime.fromisoformat
+
 logger = logging.getLogger(__name__)
 
 TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
+_MIDNIGHT = time(0, 0)
 LOOKAHEAD_MINUTES = 120
 TASK_DUE_SOON_MINUTES = 120
 TASK_HIGH_PRIORITY = 3
@@ -47,6 +56,25 @@ THREAD_WAITING_HOURS = 3
 HABIT_WINDOW_GRACE_MINUTES = 60
 HABIT_STREAK_DAYS = 2
 HABIT_PRIORITY_HIGH = 4
+_BOOST_KEYWORDS = frozenset({"cliente", "flete"})
+_CALENDAR_WINDOW_LIMITS = (10, 30, 60)
+_CALENDAR_WINDOWS = (("tminus10", 90), ("tminus30", 80), ("tminus60", 70))
+HABIT_TRIGGERS = frozenset({"habit_streak_risk", "habit_weekly_risk", "habit_window"})
+CACHE_TTL_SECONDS = 60
+CHAT_ID_CACHE_TTL_SECONDS = 300
+EVENTS_CACHE_TTL_SECONDS = 180
+
+_config_cache: tuple[float, SystemConfig] | None = None
+_chat_id_cache: tuple[float, str | None] | None = None
+_events_cache: dict[tuple[str, datetime, datetime], tuple[float, list[dict[str, object]]]] = {}
+
+_REQUEST_LABELS = {
+    "calendar_auth": "Falta autorizar Google Calendar.",
+    "default_barbershop": "Falta definir la peluqueria de siempre.",
+    "preferred_event_duration_minutes": "Falta definir la duracion preferida.",
+    "diet_store_address": "Falta la direccion de tu dietetica.",
+    "user_chat_id": "Falta definir el chat principal para proactivos.",
+}
 
 DEFAULT_CONFIG = {
     "quiet_hours_start": time(0, 0),
@@ -93,12 +121,15 @@ def run_proactive_tick(
     session_factory=SessionLocal,
 ) -> int:
     current_time = _ensure_timezone(now or datetime.now(TIMEZONE))
+    local_time = current_time.time()
     tool = calendar_tool or CalendarTool()
     sent_count = 0
 
     with session_factory() as session:
         config = _get_or_create_config(session)
-        autonomy_mode, _ = _get_autonomy_mode(session, current_time)
+        autonomy_rules = _active_autonomy_rules(session, current_time)
+        autonomy_mode = _autonomy_mode(autonomy_rules)
+        habits_off = _habits_autonomy_off(autonomy_rules)
         chat_id = _resolve_chat_id(session)
         sent_today = _count_sent_today(session, current_time)
 
@@ -106,36 +137,43 @@ def run_proactive_tick(
         candidates.extend(_calendar_candidates(tool, current_time))
         candidates.extend(_task_candidates(session, current_time))
         candidates.extend(_thread_waiting_candidates(session, current_time))
-        candidates.extend(_habit_candidates(session, current_time, config, llm_client))
+        candidates.extend(
+            _habit_candidates(
+                session,
+                current_time,
+                config,
+                llm_client,
+                use_llm=sent_today < config.daily_proactive_limit,
+            )
+        )
         candidates.sort(key=lambda item: item.score, reverse=True)
+        seen_keys = _existing_dedupe_keys(session, [item.dedupe_key for item in candidates])
+        last_sent = _last_sent_by_trigger(session, current_time, config.maybe_cooldown_minutes)
+        event_rows: list[dict[str, object]] = []
+        pending_nudges: list[tuple[Candidate, str]] = []
 
         for candidate in candidates:
-            if _has_dedupe(session, candidate.dedupe_key):
+            if candidate.dedupe_key in seen_keys:
                 continue
+            seen_keys.add(candidate.dedupe_key)
 
-            in_cooldown = _sent_recently(
-                session,
-                candidate.trigger_type,
-                current_time,
-                config.maybe_cooldown_minutes,
-            )
+            in_cooldown = candidate.trigger_type in last_sent
             decision = decide(
                 candidate,
-                current_time,
+                local_time,
                 config,
                 autonomy_mode,
                 sent_today,
                 in_cooldown,
             )
 
-            if candidate.trigger_type.startswith("habit_"):
-                if _habits_autonomy_off(session, current_time):
-                    decision = Decision("suppressed", "habits_off", decision.score)
+            if habits_off and candidate.trigger_type in HABIT_TRIGGERS:
+                decision = Decision("suppressed", "habits_off", decision.score)
 
             if decision.decision == "sent":
                 if not chat_id:
                     _record_event(
-                        session,
+                        event_rows,
                         candidate,
                         decision="suppressed",
                         reason="no_contact",
@@ -150,7 +188,7 @@ def run_proactive_tick(
                 except Exception as exc:
                     logger.warning("WAHA send_text failed: %s", exc.__class__.__name__)
                     _record_event(
-                        session,
+                        event_rows,
                         candidate,
                         decision="suppressed",
                         reason="send_failed",
@@ -159,28 +197,38 @@ def run_proactive_tick(
                     )
                     continue
 
+                sent_rows: list[dict[str, object]] = []
                 _record_event(
-                    session,
+                    sent_rows,
                     candidate,
                     decision="sent",
                     reason=decision.reason,
                     sent_at=current_time,
                     created_at=current_time,
                 )
-                _record_habit_nudge(session, candidate, decision.decision, current_time)
+                if _insert_events(session, sent_rows):
+                    _record_habit_nudge(session, candidate, decision.decision, current_time)
+                session.commit()
+                last_sent[candidate.trigger_type] = current_time
                 sent_today += 1
                 sent_count += 1
                 continue
 
             _record_event(
-                session,
+                event_rows,
                 candidate,
                 decision=decision.decision,
                 reason=decision.reason,
                 sent_at=None,
                 created_at=current_time,
             )
-            _record_habit_nudge(session, candidate, decision.decision, current_time)
+            pending_nudges.append((candidate, decision.decision))
+
+        inserted_keys = _insert_events(session, event_rows)
+        for candidate, decision_name in pending_nudges:
+            if candidate.dedupe_key in inserted_keys:
+                _record_habit_nudge(session, candidate, decision_name, current_time)
+        session.commit()
 
     return sent_count
 
@@ -199,7 +247,7 @@ def run_daily_digest(
         if existing and existing.sent_at is not None:
             return 0
 
-        day_start = datetime.combine(day, time(0, 0), tzinfo=TIMEZONE)
+        day_start = _aware_midnight(day)
         day_end = day_start + timedelta(days=1)
         events = (
             session.query(ProactiveEvent)
@@ -244,14 +292,13 @@ def run_daily_digest(
 
 def decide(
     candidate: Candidate,
-    now_local: datetime,
+    local_time: time,
     config: SystemConfig,
     autonomy_mode: str,
     sent_today: int,
     in_cooldown: bool,
 ) -> Decision:
     score = candidate.score
-    local_time = now_local.astimezone(TIMEZONE).time()
 
     if _in_quiet_hours(local_time, config) and score < config.urgent_threshold:
         return Decision("digested", "quiet_hours", score)
@@ -278,9 +325,8 @@ def decide(
 
 
 def _calendar_candidates(calendar_tool: CalendarTool, now: datetime) -> list[Candidate]:
-    time_max = now + timedelta(minutes=LOOKAHEAD_MINUTES)
     try:
-        events = calendar_tool.list_events(now, time_max)
+        events = _upcoming_events(calendar_tool, now)
     except (CalendarNotAuthorized, OAuthConfigError) as exc:
         logger.warning("Calendar unavailable: %s", exc.__class__.__name__)
         return []
@@ -288,15 +334,54 @@ def _calendar_candidates(calendar_tool: CalendarTool, now: datetime) -> list[Can
         logger.warning("Calendar list failed: %s", exc.__class__.__name__)
         return []
 
+    now_ts = now.timestamp()
     candidates: list[Candidate] = []
     for event in events:
-        candidate = _build_calendar_candidate(event, now)
+        candidate = _build_calendar_candidate(event, now_ts)
         if candidate:
             candidates.append(candidate)
     return candidates
 
 
-def _build_calendar_candidate(event: dict[str, object], now: datetime) -> Candidate | None:
+def _upcoming_events(tool: CalendarTool, now: datetime) -> list[dict[str, object]]:
+    # Fetch whole local days so the tick and the digest share cache entries.
+    time_max = now + timedelta(minutes=LOOKAHEAD_MINUTES)
+    events: list[dict[str, object]] = []
+    seen_ids: set[object] = set()
+    day_start = _aware_midnight(now.date())
+    while day_start < time_max:
+        day_end = day_start + timedelta(days=1)
+        for event in _cached_list_events(tool, day_start, day_end):
+            event_id = event.get("id")
+            if event_id in seen_ids:
+                continue
+            start_value = _parse_event_start(event.get("start"))
+            if start_value is None or not now <= start_value < time_max:
+                continue
+            seen_ids.add(event_id)
+            events.append(event)
+        day_start = day_end
+    return events
+
+
+def _cached_list_events(
+    tool: CalendarTool, time_min: datetime, time_max: datetime
+) -> list[dict[str, object]]:
+    key = (tool.calendar_id, time_min, time_max)
+    now = monotonic()
+    cached = _events_cache.get(key)
+    if cached is not None and now - cached[0] < EVENTS_CACHE_TTL_SECONDS:
+        return cached[1]
+    events = tool.list_events(time_min, time_max)
+    for stale in [
+        k for k, (ts, _) in _events_cache.items() if now - ts >= EVENTS_CACHE_TTL_SECONDS
+    ]:
+        del _events_cache[stale]
+    _events_cache[key] = (now, events)
+    return events
+
+
+def _build_calendar_candidate(event: dict[str, object], now_ts: float) -> Candidate | None:
     event_id = str(event.get("id") or "")
     if not event_id:
         return None
@@ -305,7 +390,7 @@ def _build_calendar_candidate(event: dict[str, object], now: datetime) -> Candid
     if start_value is None:
         return None
 
-    delta_minutes = (start_value.astimezone(TIMEZONE) - now).total_seconds() / 60
+    delta_minutes = (start_value.timestamp() - now_ts) / 60
     if delta_minutes <= 0 or delta_minutes > 60:
         return None
 
@@ -315,7 +400,7 @@ def _build_calendar_candidate(event: dict[str, object], now: datetime) -> Candid
 
     title = str(event.get("summary") or "Sin titulo")
     folded = _fold_text(title)
-    if "cliente" in folded or "flete" in folded:
+    if any(keyword in folded for keyword in _BOOST_KEYWORDS):
         score += 10
 
     location = event.get("location")
@@ -341,13 +426,10 @@ def _build_calendar_candidate(event: dict[str, object], now: datetime) -> Candid
 
 
 def _calendar_window_score(delta_minutes: float) -> tuple[str | None, int]:
-    if delta_minutes <= 10:
-        return "tminus10", 90
-    if delta_minutes <= 30:
-        return "tminus30", 80
-    if delta_minutes <= 60:
-        return "tminus60", 70
-    return None, 0
+    index = bisect_left(_CALENDAR_WINDOW_LIMITS, delta_minutes)
+    if index == len(_CALENDAR_WINDOW_LIMITS):
+        return None, 0
+    return _CALENDAR_WINDOWS[index]
 
 
 def _task_candidates(session, now: datetime) -> list[Candidate]:
@@ -392,17 +474,24 @@ def _habit_candidates(
     now: datetime,
     config: SystemConfig,
     llm_client: TextLlmClient | None = None,
+    use_llm: bool = True,
 ) -> list[Candidate]:
     engine = HabitEngine(session)
     habits = engine.list_habits(active_only=True)
     if not habits:
         return []
-    if llm_client is None and os.getenv("HABIT_NUDGE_USE_LLM", "1") == "1":
-        llm_client = TextLlmClient(load_llm_config(config))
+    if not use_llm:
+        llm_client = None
+    build_llm = use_llm and llm_client is None and os.getenv("HABIT_NUDGE_USE_LLM", "1") == "1"
     profile = get_or_create_coaching_profile(session)
     selector = NudgeStrategySelector(profile)
     candidates: list[Candidate] = []
     today = now.date()
+    habit_ids = [habit.id for habit in habits]
+    last_nudges = _last_nudge_by_habit(session, habit_ids)
+    last_done = _last_done_by_habit(session, habit_ids)
+    weekly_counts = _weekly_done_counts(session, habit_ids, now)
+    now_sec = _seconds_since_midnight(now.time())
 
     for habit in habits:
         if engine.habit_status_today(habit.id, today):
@@ -410,19 +499,16 @@ def _habit_candidates(
         if not engine.is_due_today(habit, now):
             continue
 
-        trigger_type, trigger_bonus = _habit_trigger(habit, session, now)
+        trigger_type, trigger_bonus = _habit_trigger(habit, last_done, weekly_counts, now, now_sec)
         if not trigger_type:
             continue
 
-        last_nudge = (
-            session.query(HabitNudge)
-            .filter(HabitNudge.habit_id == habit.id)
-            .order_by(HabitNudge.ts.desc())
-            .first()
-        )
-        choice = selector.select(habit, last_nudge)
+        choice = selector.select(habit, last_nudges.get(habit.id))
         score = min(95, choice.score + trigger_bonus)
 
+        if build_llm:
+            llm_client = TextLlmClient(load_llm_config(config))
+            build_llm = False
         message = build_nudge_message(habit, choice.strategy, profile, llm_client)
         dedupe_key = f"habit:{habit.id}:{trigger_type}:{today.isoformat()}"
         candidates.append(
@@ -441,58 +527,84 @@ def _habit_candidates(
     return candidates
 
 
+def _last_nudge_by_habit(session, habit_ids: list[int]) -> dict[int, HabitNudge]:
+    nudges = session.execute(
+        select(HabitNudge)
+        .where(HabitNudge.habit_id.in_(habit_ids))
+        .distinct(HabitNudge.habit_id)
+        .order_by(HabitNudge.habit_id, HabitNudge.ts.desc())
+    ).scalars()
+    return {nudge.habit_id: nudge for nudge in nudges}
+
+
 def _habit_trigger(
     habit: Habit,
-    session,
+    last_done: dict[int, date],
+    weekly_counts: dict[int, int],
     now: datetime,
+    now_sec: float,
 ) -> tuple[str | None, int]:
     if habit.priority and habit.priority >= HABIT_PRIORITY_HIGH:
-        last_done = _last_done_date(session, habit.id)
-        if last_done is None or (now.date() - last_done).days >= HABIT_STREAK_DAYS:
+        last_done_date = last_done.get(habit.id)
+        if last_done_date is None or (now.date() - last_done_date).days >= HABIT_STREAK_DAYS:
             return "habit_streak_risk", 10
 
     if habit.schedule_type == "weekly" and habit.target_per_week:
-        if _weekly_target_in_risk(session, habit, now):
+        if _weekly_target_in_risk(habit, weekly_counts.get(habit.id, 0), now):
             return "habit_weekly_risk", 5
 
-    if _window_closing(habit, now):
+    if _window_closing(habit, now_sec):
         return "habit_window", 0
 
     return None, 0
 
 
-def _window_closing(habit: Habit, now: datetime) -> bool:
-    window_end = datetime.combine(now.date(), habit.window_end, tzinfo=TIMEZONE)
-    window_start = datetime.combine(now.date(), habit.window_start, tzinfo=TIMEZONE)
-    if now < window_start or now > window_end:
+def _window_closing(habit: Habit, now_sec: float) -> bool:
+    window_start = _seconds_since_midnight(habit.window_start)
+    window_end = _seconds_since_midnight(habit.window_end)
+    if now_sec < window_start or now_sec > window_end:
         return False
-    remaining = window_end - now
-    return remaining <= timedelta(minutes=HABIT_WINDOW_GRACE_MINUTES)
+    return window_end - now_sec <= HABIT_WINDOW_GRACE_MINUTES * 60
 
 
-def _last_done_date(session, habit_id: int) -> date | None:
-    log = (
-        session.query(HabitLog)
-        .filter(HabitLog.habit_id == habit_id, HabitLog.status.in_(["done", "partial"]))
-        .order_by(HabitLog.date.desc())
-        .first()
-    )
-    return log.date if log else None
+def _seconds_since_midnight(value: time) -> float:
+    return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1_000_000
 
 
-def _weekly_target_in_risk(session, habit: Habit, now: datetime) -> bool:
+def _week_bounds(now: datetime) -> tuple[date, date]:
     week_start = now.date() - timedelta(days=now.date().weekday())
-    week_end = week_start + timedelta(days=7)
-    done_count = (
-        session.query(HabitLog)
-        .filter(
-            HabitLog.habit_id == habit.id,
+    return week_start, week_start + timedelta(days=7)
+
+
+def _last_done_by_habit(session, habit_ids: list[int]) -> dict[int, date]:
+    rows = session.execute(
+        select(HabitLog.habit_id, func.max(HabitLog.date))
+        .where(
+            HabitLog.habit_id.in_(habit_ids),
+            HabitLog.status.in_(["done", "partial"]),
+        )
+        .group_by(HabitLog.habit_id)
+    ).all()
+    return dict(rows)
+
+
+def _weekly_done_counts(session, habit_ids: list[int], now: datetime) -> dict[int, int]:
+    week_start, week_end = _week_bounds(now)
+    rows = session.execute(
+        select(HabitLog.habit_id, func.count(HabitLog.id))
+        .where(
+            HabitLog.habit_id.in_(habit_ids),
             HabitLog.date >= week_start,
             HabitLog.date < week_end,
             HabitLog.status.in_(["done", "partial"]),
         )
-        .count()
-    )
+        .group_by(HabitLog.habit_id)
+    ).all()
+    return dict(rows)
+
+
+def _weekly_target_in_risk(habit: Habit, done_count: int, now: datetime) -> bool:
+    _, week_end = _week_bounds(now)
     remaining_days = (week_end - now.date()).days
     remaining_possible = max(0, remaining_days)
     return habit.target_per_week > done_count + remaining_possible
@@ -500,21 +612,26 @@ def _weekly_target_in_risk(session, habit: Habit, now: datetime) -> bool:
 
 def _thread_waiting_candidates(session, now: datetime) -> list[Candidate]:
     threshold = now - timedelta(hours=THREAD_WAITING_HOURS)
-    threads = (
-        session.query(ConversationThread, Contact)
+    rows = session.execute(
+        select(
+            ConversationThread.id,
+            ConversationThread.last_message_at,
+            ConversationThread.last_summary,
+            Contact.display_name,
+            Contact.chat_id,
+        )
         .join(Contact, ConversationThread.contact_id == Contact.id)
-        .filter(
+        .where(
             ConversationThread.status == "waiting_me",
             ConversationThread.last_message_at <= threshold,
             Contact.trust_label.in_(["client", "provider", "cliente", "proveedor"]),
         )
-        .all()
-    )
+    ).all()
     candidates: list[Candidate] = []
-    for thread, contact in threads:
-        contact_name = contact.display_name or contact.chat_id
-        summary = thread.last_summary or "sin resumen"
-        dedupe_key = f"thread_waiting_me:{thread.id}:{thread.last_message_at.isoformat()}"
+    for thread_id, last_message_at, last_summary, display_name, chat_id in rows:
+        contact_name = display_name or chat_id
+        summary = last_summary or "sin resumen"
+        dedupe_key = f"thread_waiting_me:{thread_id}:{last_message_at.isoformat()}"
         message = (
             f"Tenes pendiente responder a {contact_name}: {summary}. "
             "Queres que redacte respuesta?"
@@ -522,7 +639,7 @@ def _thread_waiting_candidates(session, now: datetime) -> list[Candidate]:
         candidates.append(
             Candidate(
                 trigger_type="thread_waiting_me",
-                entity_id=str(thread.id),
+                entity_id=str(thread_id),
                 title=contact_name,
                 score=80,
                 priority=None,
@@ -543,19 +660,19 @@ def _build_digest_lines(
     calendar_map = _calendar_digest_map(calendar_tool, day_start, day_end)
     task_ids: list[int] = []
     thread_ids: list[int] = []
+    pending: list[tuple[ProactiveEvent, int | None]] = []
     for event in events:
-        if event.trigger_type != "task_due_today" or not event.entity_id:
-            pass
-        else:
-            try:
-                task_ids.append(int(event.entity_id))
-            except ValueError:
-                pass
-        if event.trigger_type == "thread_waiting_me" and event.entity_id:
-            try:
-                thread_ids.append(int(event.entity_id))
-            except ValueError:
-                pass
+        if event.trigger_type in HABIT_TRIGGERS:
+            continue
+        entity_id = event.entity_id
+        numeric_id = int(entity_id) if entity_id and entity_id.isdecimal() else None
+        if numeric_id is not None:
+            if event.trigger_type == "task_due_today":
+                task_ids.append(numeric_id)
+            elif event.trigger_type == "thread_waiting_me":
+                thread_ids.append(numeric_id)
+        pending.append((event, numeric_id))
+
     task_map = {}
     if task_ids:
         rows = session.query(Task).filter(Task.id.in_(task_ids)).all()
@@ -575,26 +692,14 @@ def _build_digest_lines(
             thread_map[thread.id] = f"Pendiente: {name} ({summary})"
 
     lines: list[str] = []
-    for event in events:
-        if event.trigger_type.startswith("habit_"):
-            continue
+    for event, numeric_id in pending:
         if event.trigger_type == "calendar_upcoming":
             label = calendar_map.get(event.entity_id or "", f"Evento: {event.entity_id}")
         elif event.trigger_type == "task_due_today":
-            title = None
-            if event.entity_id:
-                try:
-                    title = task_map.get(int(event.entity_id))
-                except ValueError:
-                    title = None
+            title = task_map.get(numeric_id) if numeric_id is not None else None
             label = f"Tarea: {title or event.entity_id}"
         elif event.trigger_type == "thread_waiting_me":
-            label = "Pendiente: conversacion"
-            if event.entity_id:
-                try:
-                    label = thread_map.get(int(event.entity_id), label)
-                except ValueError:
-                    pass
+            label = thread_map.get(numeric_id, "Pendiente: conversacion")
         else:
             label = f"{event.trigger_type}: {event.entity_id}"
         lines.append(label)
@@ -606,7 +711,7 @@ def _calendar_digest_map(
 ) -> dict[str, str]:
     tool = calendar_tool or CalendarTool()
     try:
-        events = tool.list_events(day_start, day_end)
+        events = _cached_list_events(tool, day_start, day_end)
     except Exception as exc:
         logger.warning("Calendar digest list failed: %s", exc.__class__.__name__)
         return {}
@@ -684,51 +789,75 @@ def _build_habit_digest_lines(session, now: datetime) -> list[str]:
 
 
 def _request_digest_label(request: AssistantRequest) -> str:
-    key = request.key
-    labels = {
-        "calendar_auth": "Falta autorizar Google Calendar.",
-        "default_barbershop": "Falta definir la peluqueria de siempre.",
-        "preferred_event_duration_minutes": "Falta definir la duracion preferida.",
-        "diet_store_address": "Falta la direccion de tu dietetica.",
-        "user_chat_id": "Falta definir el chat principal para proactivos.",
-    }
-    label = labels.get(key)
+    label = _REQUEST_LABELS.get(request.key)
     if label:
         return label
-    prompt = (request.prompt or "").split("?")[0].strip()
-    return prompt or f"Falta: {key}"
+    prompt = (request.prompt or "").split("?", 1)[0].strip()
+    return prompt or f"Falta: {request.key}"
+
+
+def clear_proactive_cache() -> None:
+    global _config_cache, _chat_id_cache
+    _config_cache = None
+    _chat_id_cache = None
+    _events_cache.clear()
+
+
+on_commit_flag("user_chat_id_changed", clear_proactive_cache)
 
 
 def _get_or_create_config(session) -> SystemConfig:
+    global _config_cache
+    if _config_cache is not None and monotonic() - _config_cache[0] < CACHE_TTL_SECONDS:
+        return _config_cache[1]
+
     config = session.query(SystemConfig).order_by(SystemConfig.id.asc()).first()
-    if config:
-        return config
+    if config is None:
+        config = SystemConfig(**DEFAULT_CONFIG)
+        session.add(config)
+        session.commit()
 
-    config = SystemConfig(**DEFAULT_CONFIG)
-    session.add(config)
-    session.commit()
-    return config
+    snapshot = SystemConfig(
+        **{attr.key: getattr(config, attr.key) for attr in inspect(SystemConfig).column_attrs}
+    )
+    _config_cache = (monotonic(), snapshot)
+    return snapshot
 
 
-def _get_autonomy_mode(session, now_local: datetime) -> tuple[str, datetime | None]:
-    rules = (
-        session.query(AutonomyRule)
-        .filter(AutonomyRule.scope == "global")
-        .order_by(AutonomyRule.created_at.desc())
-        .all()
-    )
+def _active_autonomy_rules(session, now_local: datetime) -> dict[str, AutonomyRule]:
     now_utc = now_local.astimezone(timezone.utc)
+    rules = session.execute(
+        select(AutonomyRule)
+        .where(
+            AutonomyRule.scope.in_(["global", "habits"]),
+            or_(AutonomyRule.until_at.is_(None), AutonomyRule.until_at >= now_utc),
+        )
+        .order_by(AutonomyRule.created_at.desc())
+    ).scalars()
+    latest: dict[str, AutonomyRule] = {}
     for rule in rules:
-        if rule.until_at and rule.until_at < now_utc:
-            continue
-        return rule.mode, rule.until_at
-    return "normal", None
+        latest.setdefault(rule.scope, rule)
+    return latest
+
+
+def _autonomy_mode(rules: dict[str, AutonomyRule]) -> str:
+    rule = rules.get("global")
+    return rule.mode if rule else "normal"
 
 
 def _resolve_chat_id(session) -> str | None:
+    global _chat_id_cache
     explicit = os.getenv("USER_CHAT_ID") or os.getenv("PROACTIVE_CHAT_ID")
     if explicit:
         return explicit
+    if _chat_id_cache is not None and monotonic() - _chat_id_cache[0] < CHAT_ID_CACHE_TTL_SECONDS:
+        return _chat_id_cache[1]
+    chat_id = _lookup_chat_id(session)
+    _chat_id_cache = (monotonic(), chat_id)
+    return chat_id
+
+
+def _lookup_chat_id(session) -> str | None:
     fact = (
         session.query(MemoryFact)
         .filter(
@@ -747,62 +876,74 @@ def _resolve_chat_id(session) -> str | None:
 
 
 def _count_sent_today(session, now_local: datetime) -> int:
-    day_start = datetime.combine(now_local.date(), time(0, 0), tzinfo=TIMEZONE)
+    day_start = _aware_midnight(now_local.date())
     day_end = day_start + timedelta(days=1)
-    return (
-        session.query(ProactiveEvent)
-        .filter(
+    return session.execute(
+        select(func.count(ProactiveEvent.id)).where(
             ProactiveEvent.sent_at >= day_start,
             ProactiveEvent.sent_at < day_end,
         )
-        .count()
-    )
+    ).scalar_one()
 
 
-def _sent_recently(
-    session, trigger_type: str, now_local: datetime, cooldown_minutes: int
-) -> bool:
+def _last_sent_by_trigger(
+    session, now_local: datetime, cooldown_minutes: int
+) -> dict[str, datetime]:
     since = now_local - timedelta(minutes=cooldown_minutes)
-    return (
-        session.query(ProactiveEvent)
-        .filter(
-            ProactiveEvent.trigger_type == trigger_type,
+    rows = session.execute(
+        select(ProactiveEvent.trigger_type, func.max(ProactiveEvent.sent_at))
+        .where(
             ProactiveEvent.decision == "sent",
             ProactiveEvent.sent_at >= since,
         )
-        .first()
-        is not None
+        .group_by(ProactiveEvent.trigger_type)
+    ).all()
+    return dict(rows)
+
+
+def _existing_dedupe_keys(session, dedupe_keys: list[str]) -> set[str]:
+    if not dedupe_keys:
+        return set()
+    return set(
+        session.execute(
+            select(ProactiveEvent.dedupe_key).where(ProactiveEvent.dedupe_key.in_(dedupe_keys))
+        ).scalars()
     )
 
 
-def _has_dedupe(session, dedupe_key: str) -> bool:
-    return session.query(ProactiveEvent.id).filter_by(dedupe_key=dedupe_key).first() is not None
-
-
 def _record_event(
-    session,
+    event_rows: list[dict[str, object]],
     candidate: Candidate,
     decision: str,
     reason: str | None,
     sent_at: datetime | None,
     created_at: datetime | None,
 ) -> None:
-    record = ProactiveEvent(
-        trigger_type=candidate.trigger_type,
-        dedupe_key=candidate.dedupe_key,
-        entity_id=candidate.entity_id,
-        priority=candidate.priority,
-        score=candidate.score,
-        decision=decision,
-        reason=reason,
-        sent_at=sent_at,
-        created_at=created_at,
+    event_rows.append(
+        {
+            "trigger_type": candidate.trigger_type,
+            "dedupe_key": candidate.dedupe_key,
+            "entity_id": candidate.entity_id,
+            "priority": candidate.priority,
+            "score": candidate.score,
+            "decision": decision,
+            "reason": reason,
+            "sent_at": sent_at,
+            "created_at": created_at,
+        }
     )
-    session.add(record)
-    try:
-        session.commit()
-    except IntegrityError:
-        session.rollback()
+
+
+def _insert_events(session, event_rows: list[dict[str, object]]) -> set[str]:
+    if not event_rows:
+        return set()
+    inserted = session.execute(
+        pg_insert(ProactiveEvent)
+        .values(event_rows)
+        .on_conflict_do_nothing(index_elements=["dedupe_key"])
+        .returning(ProactiveEvent.dedupe_key)
+    ).scalars()
+    return set(inserted)
 
 
 def _record_habit_nudge(
@@ -811,7 +952,7 @@ def _record_habit_nudge(
     decision: str,
     now: datetime,
 ) -> None:
-    if not candidate.trigger_type.startswith("habit_"):
+    if candidate.trigger_type not in HABIT_TRIGGERS:
         return
     if not candidate.strategy:
         strategy = "micro_action"
@@ -832,7 +973,6 @@ def _record_habit_nudge(
     session.add(record)
     if decision == "sent":
         record_nudge_sent(session, strategy)
-    session.commit()
 
 
 def _in_quiet_hours(local_time: time, config: SystemConfig) -> bool:
@@ -843,19 +983,9 @@ def _in_strong_window(local_time: time, config: SystemConfig) -> bool:
     return config.strong_window_start <= local_time < config.strong_window_end
 
 
-def _habits_autonomy_off(session, now_local: datetime) -> bool:
-    rules = (
-        session.query(AutonomyRule)
-        .filter(AutonomyRule.scope == "habits")
-        .order_by(AutonomyRule.created_at.desc())
-        .all()
-    )
-    now_utc = now_local.astimezone(timezone.utc)
-    for rule in rules:
-        if rule.until_at and rule.until_at < now_utc:
-            continue
-        return rule.mode != "on"
-    return False
+def _habits_autonomy_off(rules: dict[str, AutonomyRule]) -> bool:
+    rule = rules.get("habits")
+    return rule is not None and rule.mode != "on"
 
 
 def _parse_event_start(value: object | None) -> datetime | None:
@@ -867,11 +997,10 @@ def _parse_event_start(value: object | None) -> datetime | None:
             day = date.fromisoformat(value_str)
         except ValueError:
             return None
-        return datetime.combine(day, time(0, 0), tzinfo=TIMEZONE)
+        return _aware_midnight(day)
 
-    value_str = value_str.replace("Z", "+00:00")
     try:
-        parsed = datetime.fromisoformat(value_str)
+        parsed = _parse_iso(value_str)
     except ValueError:
         return None
     if parsed.tzinfo is None:
@@ -879,6 +1008,12 @@ def _parse_event_start(value: object | None) -> datetime | None:
     return parsed
 
 
+@lru_cache(maxsize=64)
+def _aware_midnight(day: date) -> datetime:
+    return datetime.combine(day, _MIDNIGHT, tzinfo=TIMEZONE)
+
+
+@lru_cache(maxsize=1024)
 def _fold_text(text: str) -> str:
     normalized = unicodedata.normalize("NFKD", text)
     ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
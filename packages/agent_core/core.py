@@ -1,18 +1,29 @@
 from __future__ import annotations
 
+from bisect import bisect_left
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import date, datetime, time, timedelta, timezone
+from functools import lru_cache
+import hashlib
 import os
 import re
+import threading
+from time import monotonic
 import unicodedata
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from zoneinfo import ZoneInfo
 
+from sqlalchemy import event, func, inspect, or_, select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+
 from packages.agent_core.tools.calendar_tool import CalendarNotAuthorized, CalendarTool
 from packages.agent_core.tools.google_oauth import OAuthConfigError
 from packages.assistant_requests import (
     NeedsDetector,
     RequestPolicy,
+    build_dedupe_key,
     count_requests_asked_today,
     get_active_request,
     get_open_requests,
@@ -32,38 +43,123 @@ from packages.db.models import (
     SystemConfig,
     ToolRun,
 )
-from packages.llm.client import LlmClient, load_llm_config
-from packages.llm.context_builder import ContextBuilder
-from packages.llm.supervisor import Supervisor
-from packages.llm.tools_registry import execute_tool, get_tool_scope, get_tool_names
-from packages.memory.service import MemoryRetriever
 from packages.memory.tagger import extract_tags
 from packages.habits.engine import HabitEngine, get_or_create_coaching_profile
 from packages.habits.parsing import parse_habit_text
 from packages.relations.contact_handler import send_contact_reply
 from packages.relations.message_tools import send_message_and_store
-from packages.relations.policy import ContactPolicy
 from packages.relations.trust import TrustEngine
 
-TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
+if TYPE_CHECKING:
+    from packages.llm.client import LlmClient
+    from packages.llm.schema import PlannerOutput
 
-CANCEL_COMMANDS = {"cancelar", "cancela", "olvidalo"}
-CONFIRM_COMMANDS = {"confirmo", "si", "s", "ok"}
+TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
+_TZ_KEY = TIMEZONE.key
+
+CANCEL_COMMANDS = frozenset({"cancelar", "cancela", "olvidalo"})
+CONFIRM_COMMANDS = frozenset({"confirmo", "si", "s", "ok"})
+_RECALL_KEYWORDS = ("recordas", "acordas", "tenes info", "tenes datos")
+_MEMORY_KEYWORDS = ("de siempre",) + _RECALL_KEYWORDS
+_LLM_KEYWORDS = (
+    "agend",
+    "crear",
+    "evento",
+    "calendario",
+    "recorda",
+    "turno",
+    "necesito",
+    "queres",
+    "pod",
+)
+_COMMAND_INTENT: dict[str, str] = {
+    **dict.fromkeys(CANCEL_COMMANDS, "cancel"),
+    **dict.fromkeys(CONFIRM_COMMANDS, "confirm"),
+}
+_TAG_LABELS: dict[str, str] = {
+    "peluqueria": "peluqueria",
+    "fletes": "servicio de fletes",
+    "camionetas": "camioneta",
+    "ascend": "dietetica",
+    "agenda": "agenda",
+}
+_DOW_LABELS = ("lun", "mar", "mie", "jue", "vie", "sab", "dom")
+_MODE_LABELS: dict[str, str] = {
+    "normal": "normal",
+    "focus": "foco",
+    "urgencies_only": "solo urgencias",
+}
+PLAN_CACHE_TTL_SECONDS = 3600
+PLAN_CACHE_MAX_ENTRIES = 1024
+
+CONFIG_CACHE_TTL_SECONDS = 30
+
+_IO_EXECUTOR = ThreadPoolExecutor(max_workers=8, thread_name_prefix="agent-io")
+
+_plan_cache: OrderedDict[bytes, tuple[float, PlannerOutput]] = OrderedDict()
+_plan_cache_lock = threading.Lock()
+_config_cache: tuple[float, SystemConfig] | None = None
+_autonomy_mode_cache: tuple[float, str, datetime | None] | None = None
+_day_bounds_cache: tuple[date, datetime, datetime] | None = None
+
+_FOLD_TABLE = str.maketrans(
+    "\u00e1\u00e9\u00ed\u00f3\u00fa\u00fc\u00f1\u00c1\u00c9\u00cd\u00d3\u00da\u00dc\u00d1",
+    "aeiouunAEIOUUN",
+    "\u00bf\u00a1",
+)
+_ISO_DATE_RE = re.compile(r"\b(\d{4})-(\d{2})-(\d{2})\b")
+_DATETIME_TOKEN_RE = re.compile(r"\b(?:(\d{4})-(\d{2})-(\d{2})|(\d{1,2}):(\d{2})|(\d{1,2}))\b")
+_DURATION_RE = re.compile(r"\b(\d{1,3})\s*(minutos|min|m)\b")
+_INT_RE = re.compile(r"\b(\d{1,3})\b")
+_CHOICE_RE = re.compile(r"\b([12])\b")
+_AGEND_RE = re.compile(r"\bagend\w*\b\s*(?P<rest>.+)", re.I)
+_TITLE_SCRUB_RES = (
+    re.compile(r"\b(hoy|manana)\b", re.I),
+    re.compile(r"\b\d{4}-\d{2}-\d{2}\b"),
+    re.compile(r"\b\d{1,2}(:\d{2})?\b"),
+    re.compile(r"\b\d{1,3}\s*(minutos|min|m)\b", re.I),
+    re.compile(r"\bpor\b", re.I),
+    re.compile(r"\ba\s+las\b", re.I),
+)
+_CONTACT_LABEL_RE = re.compile(r"^contacto\s+(.+?)\s+es\s+(proveedor|cliente|amigo|inner)\b")
+_TRUST_LEVEL_RE = re.compile(r"^subi confianza\s+(.+?)\s+a\s+(\d{1,3})\b")
+_AUTO_REPLY_ON_RE = re.compile(r"^auto[-\s]?reply\s+on\s+(.+)$")
+_AUTO_REPLY_OFF_RE = re.compile(r"^auto[-\s]?reply\s+off\s+(.+)$")
+_FOCUS_COMMAND_RE = re.compile(
+    r"^(?P<autonomy_on>autonomia on)|^(?P<autonomy_off>autonomia off)"
+    r"|(?P<autonomy_status>status autonomia)|(?P<proactive_status>status proactivo)"
+    r"|^(?P<focus>modo foco|no me jodas)|(?P<urgencies>solo urgencias)"
+    r"|^(?P<normal>(?:modo )?normal)\Z"
+)
+_CONTACT_TRIGGER_RE = re.compile(r"^(?:contacto\s|subi confianza\s|auto[-\s]?reply\s)")
+_HABIT_SCHEDULE_RE = re.compile(
+    r"\b(?:\d+\s*veces\s*por\s*semana"
+    r"|lunes|martes|miercoles|jueves|viernes|sabado|domingo|lun|mar|mie|jue|vie|sab|dom)\b",
+    re.I,
+)
 
 
-@dataclass
+@dataclass(slots=True)
 class Action:
     type: str
     payload: dict[str, Any]
 
 
-@dataclass
+@dataclass(slots=True)
 class AgentResult:
     reply_text: str
     actions_to_execute: list[Action] = field(default_factory=list)
     store_updates: list[dict[str, Any]] = field(default_factory=list)
 
 
+@dataclass(slots=True)
+class MessageContext:
+    chat_id: str
+    normalized: str
+    folded: str
+    now_local: datetime
+
+
 def handle_incoming_message(
     chat_id: str,
     sender_id: str | None,
@@ -77,83 +173,117 @@ def handle_incoming_message(
     if not normalized:
         return AgentResult(reply_text="Recibi tu mensaje")
 
+    ctx = MessageContext(chat_id, normalized, folded, datetime.now(TIMEZONE))
     with SessionLocal() as session:
         state = _get_or_create_state(session, chat_id)
+        result = _route_message(session, state, ctx)
+        session.commit()
+    return result
 
-        if folded and folded in CANCEL_COMMANDS:
-            state.pending_action_json = None
-            state.pending_question_json = None
-            state.last_intent = "cancel"
-            session.commit()
-            return AgentResult(reply_text="Listo, cancelado.")
-
-        if folded and state.pending_action_json and folded in CONFIRM_COMMANDS:
-            result = _confirm_pending_action(session, state, chat_id)
-            if result:
-                return result
-
-        request_answer = _handle_assistant_request_answer(session, chat_id, normalized, folded)
-        if request_answer:
-            return request_answer
-
-        focus_result = _handle_focus_commands(session, state, folded)
-        if focus_result:
-            return focus_result
-
-        contact_result = _handle_contact_commands(session, folded)
-        if contact_result:
-            return contact_result
-
-        habit_result = _handle_habit_commands(session, folded, normalized)
-        if habit_result:
-            return habit_result
-
-        if state.pending_question_json:
-            pending_result = _handle_pending_question(session, state, normalized)
-            if pending_result:
-                return pending_result
-
-        if state.pending_action_json and folded:
-            return AgentResult(reply_text="Tenes un plan pendiente. Escribi confirmo o cancelar.")
-
-        list_request = _parse_list_request(normalized)
-        if list_request and _calendar_auth_missing():
-            state.last_intent = "needs_auth"
-            reply = _handle_calendar_auth_needed(session, chat_id)
-            return AgentResult(reply_text=reply)
-        if list_request:
-            return _handle_list_request(session, chat_id, list_request)
-
-        schedule_request = _parse_schedule_request(normalized)
-
-        tags = extract_tags(normalized)
+
+def _route_message(session, state: ConversationState, ctx: MessageContext) -> AgentResult:
+    command_intent = _COMMAND_INTENT.get(ctx.folded) if ctx.folded else None
+    if command_intent == "cancel":
+        state.pending_action_json = None
+        state.pending_question_json = None
+        state.last_intent = "cancel"
+        return AgentResult(reply_text="Listo, cancelado.")
+
+    if command_intent == "confirm" and state.pending_action_json:
+        result = _confirm_pending_action(session, state, ctx.chat_id)
+        if result:
+            return result
+
+    request_answer = _handle_assistant_request_answer(
+        session, ctx.chat_id, ctx.normalized, ctx.folded, now=ctx.now_local
+    )
+    if request_answer:
+        return request_answer
+
+    if ctx.folded:
+        for trigger, handler in _COMMAND_ROUTES:
+            if trigger.search(ctx.folded):
+                command_result = handler(session, state, ctx.normalized, ctx.folded, ctx.now_local)
+                if command_result:
+                    return command_result
+
+    if state.pending_question_json:
+        pending_result = _handle_pending_question(
+            session, state, ctx.normalized, ctx.folded, now=ctx.now_local
+        )
+        if pending_result:
+            return pending_result
+
+    if state.pending_action_json and ctx.folded:
+        return AgentResult(reply_text="Tenes un plan pendiente. Escribi confirmo o cancelar.")
+
+    list_request = _parse_list_request(ctx.normalized, ctx.folded, now=ctx.now_local)
+    if list_request and _calendar_auth_missing():
+        state.last_intent = "needs_auth"
+        reply = _handle_calendar_auth_needed(session, ctx.chat_id, now=ctx.now_local)
+        return AgentResult(reply_text=reply)
+    if list_request:
+        return _handle_list_request(session, ctx.chat_id, list_request)
+
+    schedule_request = _parse_schedule_request(ctx.normalized, ctx.folded, now=ctx.now_local)
+
+    busy_future: Future[list[tuple[datetime, datetime]]] | None = None
+    if ctx.folded and _contains_any(ctx.folded, _MEMORY_KEYWORDS):
+        busy_future = _prefetch_availability(schedule_request)
+        tags = extract_tags(ctx.normalized)
         memory_result = _handle_memory_request(
-            session, normalized, folded, tags, chat_id, schedule_request
+            session,
+            ctx.normalized,
+            ctx.folded,
+            tags,
+            ctx.chat_id,
+            schedule_request,
+            now=ctx.now_local,
         )
         if memory_result:
+            if busy_future is not None:
+                busy_future.cancel()
             return memory_result
 
-        if schedule_request:
-            if schedule_request.get("start_dt") and schedule_request.get("duration_minutes"):
-                if _calendar_auth_missing():
-                    state.last_intent = "needs_auth"
-                    reply = _handle_calendar_auth_needed(session, chat_id)
-                    return AgentResult(reply_text=reply)
-            return _handle_schedule_request(session, state, schedule_request, chat_id)
+    if schedule_request:
+        if schedule_request.get("start_dt") and schedule_request.get("duration_minutes"):
+            if _calendar_auth_missing():
+                state.last_intent = "needs_auth"
+                reply = _handle_calendar_auth_needed(session, ctx.chat_id, now=ctx.now_local)
+                return AgentResult(reply_text=reply)
+        return _handle_schedule_request(
+            session, state, schedule_request, ctx.chat_id, busy_future=busy_future
+        )
 
-        llm_result = _handle_llm_planner(session, state, normalized, chat_id)
-        if llm_result:
-            return llm_result
+    llm_result = _handle_llm_planner(session, state, ctx)
+    if llm_result:
+        return llm_result
 
-        request_prompt = _maybe_ask_request(session, state, chat_id, normalized)
-        if request_prompt:
-            return AgentResult(reply_text=request_prompt)
+    request_prompt = _maybe_ask_request(session, state, ctx)
+    if request_prompt:
+        return AgentResult(reply_text=request_prompt)
 
     return AgentResult(reply_text="Recibi tu mensaje")
 
 
+def _prefetch_availability(
+    request: dict[str, Any] | None,
+) -> Future[list[tuple[datetime, datetime]]] | None:
+    if not request or not request.get("start_dt") or not request.get("duration_minutes"):
+        return None
+    if _calendar_auth_missing():
+        return None
+    return _IO_EXECUTOR.submit(
+        _list_busy_around, _get_calendar_tool(), request["start_dt"], request["duration_minutes"]
+    )
+
+
 def _handle_schedule_request(
-    session, state: ConversationState, request: dict[str, Any], chat_id: str
+    session,
+    state: ConversationState,
+    request: dict[str, Any],
+    chat_id: str,
+    busy_future: Future[list[tuple[datetime, datetime]]] | None = None,
 ) -> AgentResult:
     title = request["title"]
     start_dt: datetime | None = request.get("start_dt")
@@ -169,7 +299,6 @@ def _handle_schedule_request(
             "chat_id": chat_id,
         }
         state.last_intent = "calendar_schedule"
-        session.commit()
         reply = "Para que dia y hora? (ej: manana 16)"
         if location:
             reply = f"{reply} Voy a usar {location}."
@@ -179,27 +308,30 @@ def _handle_schedule_request(
         state.pending_question_json = {
             "type": "duration_minutes",
             "title": title,
-            "start_dt": start_dt.isoformat(),
+            "start_ts": int(start_dt.timestamp()),
             "location": location,
             "chat_id": chat_id,
         }
         state.last_intent = "calendar_schedule"
-        session.commit()
         reply = "Cuanto dura? 30/60/90"
         if location:
             reply = f"{reply} Voy a usar {location}."
         return AgentResult(reply_text=reply)
 
-    calendar_tool = CalendarTool()
+    calendar_tool = _get_calendar_tool()
     if not calendar_tool.has_token():
         state.last_intent = "needs_auth"
-        session.commit()
         return AgentResult(reply_text=_handle_calendar_auth_needed(session, chat_id))
 
     end_dt = start_dt + timedelta(minutes=duration)
     try:
-        if not calendar_tool.is_free(start_dt, end_dt):
-            alternatives = _find_alternatives(calendar_tool, start_dt, duration)
+        busy = (
+            busy_future.result()
+            if busy_future is not None
+            else _list_busy_around(calendar_tool, start_dt, duration)
+        )
+        if not _slot_is_free(busy, start_dt, end_dt):
+            alternatives = _find_alternatives(busy, start_dt, duration)
             if not alternatives:
                 return AgentResult(
                     reply_text="No hay disponibilidad en ese horario. Proba otro."
@@ -211,54 +343,48 @@ def _handle_schedule_request(
                 "duration_minutes": duration,
                 "options": [
                     {
-                        "start": alt.isoformat(),
-                        "end": (alt + timedelta(minutes=duration)).isoformat(),
+                        "start_ts": int(alt.timestamp()),
+                        "end_ts": int((alt + timedelta(minutes=duration)).timestamp()),
                     }
                     for alt in alternatives
                 ],
                 "chat_id": chat_id,
             }
             state.last_intent = "calendar_schedule"
-            session.commit()
 
-            reply_lines = ["Hay conflicto. Opciones:"]
-            for idx, alt in enumerate(alternatives, start=1):
-                reply_lines.append(f"{idx}) {_format_datetime(alt)}")
-            reply_lines.append("Responde 1 o 2.")
-            return AgentResult(reply_text=" ".join(reply_lines))
+            options = " ".join(
+                f"{idx}) {_format_datetime(alt)}" for idx, alt in enumerate(alternatives, start=1)
+            )
+            return AgentResult(reply_text=f"Hay conflicto. Opciones: {options} Responde 1 o 2.")
     except CalendarNotAuthorized:
         state.last_intent = "needs_auth"
-        session.commit()
         return AgentResult(reply_text=_handle_calendar_auth_needed(session, chat_id))
     except OAuthConfigError:
         state.last_intent = "config_error"
-        session.commit()
         return AgentResult(reply_text="Falta configurar Google Calendar.")
 
     plan_payload = {
         "type": "calendar_create",
         "payload": {
             "title": title,
-            "start": start_dt.isoformat(),
-            "end": end_dt.isoformat(),
-            "timezone": TIMEZONE.key,
+            "start_ts": int(start_dt.timestamp()),
+            "end_ts": int(end_dt.timestamp()),
+            "timezone": _TZ_KEY,
             "location": location,
         },
     }
     state.pending_action_json = plan_payload
     state.pending_question_json = None
     state.last_intent = "calendar_schedule"
-    session.commit()
 
     return AgentResult(reply_text=_build_plan_text(plan_payload["payload"]))
 
 
 def _handle_list_request(session, chat_id: str, request: dict[str, Any]) -> AgentResult:
     day = request["day"]
-    start_dt = datetime.combine(day, time(0, 0), tzinfo=TIMEZONE)
-    end_dt = start_dt + timedelta(days=1)
+    start_dt, end_dt = _day_bounds(day)
 
-    calendar_tool = CalendarTool()
+    calendar_tool = _get_calendar_tool()
     if not calendar_tool.has_token():
         return AgentResult(reply_text=_handle_calendar_auth_needed(session, chat_id))
 
@@ -272,19 +398,20 @@ def _handle_list_request(session, chat_id: str, request: dict[str, Any]) -> Agen
     if not events:
         return AgentResult(reply_text=f"No tenes eventos para {day.isoformat()}.")
 
-    lines = [f"Eventos para {day.isoformat()}:"]
-    for event in events:
-        lines.append(_format_event_line(event))
-    return AgentResult(reply_text=" ".join(lines))
+    body = " ".join(_format_event_line(event) for event in events)
+    return AgentResult(reply_text=f"Eventos para {day.isoformat()}: {body}")
 
 
 def _handle_pending_question(
-    session, state: ConversationState, normalized: str
+    session,
+    state: ConversationState,
+    normalized: str,
+    folded: str | None = None,
+    now: datetime | None = None,
 ) -> AgentResult | None:
     question = state.pending_question_json
     if not isinstance(question, dict):
         state.pending_question_json = None
-        session.commit()
         return None
 
     q_type = question.get("type")
@@ -293,10 +420,9 @@ def _handle_pending_question(
         if duration is None:
             return AgentResult(reply_text="Indica la duracion en minutos (30/60/90).")
 
-        start_dt = _parse_iso_datetime(question.get("start_dt"))
+        start_dt = _stored_datetime(question, "start_ts", "start_dt")
         if start_dt is None:
             state.pending_question_json = None
-            session.commit()
             return AgentResult(reply_text="Para que dia y hora?")
 
         request = {
@@ -306,11 +432,10 @@ def _handle_pending_question(
             "location": question.get("location"),
         }
         state.pending_question_json = None
-        session.commit()
         return _handle_schedule_request(session, state, request, question.get("chat_id") or "")
 
     if q_type == "start_time":
-        start_dt = _parse_datetime(normalized)
+        start_dt = _parse_datetime(normalized, folded, now=now)
         if start_dt is None:
             return AgentResult(reply_text="Para que dia y hora? (ej: manana 16)")
 
@@ -323,18 +448,16 @@ def _handle_pending_question(
                 "location": question.get("location"),
             }
             state.pending_question_json = None
-            session.commit()
             return _handle_schedule_request(session, state, request, question.get("chat_id") or "")
 
         state.pending_question_json = {
             "type": "duration_minutes",
             "title": question.get("title") or "Sin titulo",
-            "start_dt": start_dt.isoformat(),
+            "start_ts": int(start_dt.timestamp()),
             "location": question.get("location"),
             "chat_id": question.get("chat_id"),
         }
         state.last_intent = "calendar_schedule"
-        session.commit()
         return AgentResult(reply_text="Cuanto dura? 30/60/90")
 
     if q_type == "conflict_choice":
@@ -344,31 +467,31 @@ def _handle_pending_question(
             return AgentResult(reply_text="Responde 1 o 2.")
 
         option = options[choice]
+        option_start = _stored_datetime(option, "start_ts", "start")
+        option_end = _stored_datetime(option, "end_ts", "end")
         plan_payload = {
             "type": "calendar_create",
             "payload": {
                 "title": question.get("title") or "Sin titulo",
-                "start": option.get("start"),
-                "end": option.get("end"),
-                "timezone": TIMEZONE.key,
+                "start_ts": int(option_start.timestamp()) if option_start else None,
+                "end_ts": int(option_end.timestamp()) if option_end else None,
+                "timezone": _TZ_KEY,
                 "location": question.get("location"),
             },
         }
         state.pending_question_json = None
         state.pending_action_json = plan_payload
         state.last_intent = "calendar_schedule"
-        session.commit()
         return AgentResult(reply_text=_build_plan_text(plan_payload["payload"]))
 
     if q_type == "focus_hours":
         hours = _parse_int(normalized)
         if hours is None:
             return AgentResult(reply_text="Por cuantas horas?")
-        _create_autonomy_rule(session, scope="global", mode="focus", hours=hours)
+        _create_autonomy_rule(session, scope="global", mode="focus", hours=hours, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "focus_mode"
-        session.commit()
         return AgentResult(reply_text=f"Modo foco activado por {hours} horas.")
 
     if q_type == "autonomy_hours":
@@ -376,20 +499,18 @@ def _handle_pending_question(
         if hours is None:
             return AgentResult(reply_text="Por cuantas horas?")
         scope = question.get("scope") or "calendar_create"
-        _create_autonomy_rule(session, scope=scope, mode="on", hours=hours)
+        _create_autonomy_rule(session, scope=scope, mode="on", hours=hours, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "autonomy_on"
-        session.commit()
         return AgentResult(reply_text=f"Autonomia activada para {scope} por {hours} horas.")
 
     state.pending_question_json = None
-    session.commit()
     return None
 
 
 def _handle_assistant_request_answer(
-    session, chat_id: str, normalized: str, folded: str | None
+    session, chat_id: str, normalized: str, folded: str | None, now: datetime | None = None
 ) -> AgentResult | None:
     if not folded:
         return None
@@ -398,15 +519,13 @@ def _handle_assistant_request_answer(
     if request is None:
         return None
 
-    now_local = datetime.now(TIMEZONE)
+    now_local = now or datetime.now(TIMEZONE)
     if folded in {"omitir", "despues"}:
         mark_request_dismissed(session, request, now_local)
-        session.commit()
         return AgentResult(reply_text="Listo, lo dejo para mas tarde.")
 
     if request.request_type == "authorize_calendar":
         mark_request_answered(session, request, now_local)
-        session.commit()
         return AgentResult(reply_text=_auth_message())
 
     if request.key == "preferred_event_duration_minutes":
@@ -422,7 +541,6 @@ def _handle_assistant_request_answer(
             source_ref=f"request:{request.id}",
         )
         mark_request_answered(session, request, now_local)
-        session.commit()
         return AgentResult(reply_text="Listo, lo guarde.")
 
     if request.key == "default_barbershop":
@@ -435,7 +553,6 @@ def _handle_assistant_request_answer(
             source_ref=f"request:{request.id}",
         )
         mark_request_answered(session, request, now_local)
-        session.commit()
         return AgentResult(reply_text="Listo, lo guarde.")
 
     if request.key == "diet_store_address":
@@ -448,7 +565,6 @@ def _handle_assistant_request_answer(
             source_ref=f"request:{request.id}",
         )
         mark_request_answered(session, request, now_local)
-        session.commit()
         return AgentResult(reply_text="Listo, lo guarde.")
 
     if request.key == "user_chat_id":
@@ -461,11 +577,10 @@ def _handle_assistant_request_answer(
             source_ref=f"request:{request.id}",
         )
         mark_request_answered(session, request, now_local)
-        session.commit()
+        session.info["user_chat_id_changed"] = True
         return AgentResult(reply_text="Listo, lo guarde.")
 
     mark_request_answered(session, request, now_local)
-    session.commit()
     return AgentResult(reply_text="Listo, lo guarde.")
 
 
@@ -475,7 +590,6 @@ def _confirm_pending_action(
     pending = state.pending_action_json
     if not isinstance(pending, dict):
         state.pending_action_json = None
-        session.commit()
         return None
 
     action_type = pending.get("type")
@@ -486,7 +600,6 @@ def _confirm_pending_action(
         text = payload.get("text")
         if not contact_chat_id or not text:
             state.pending_action_json = None
-            session.commit()
             return AgentResult(reply_text="No pude enviar el mensaje. Reintenta.")
 
         success = False
@@ -510,48 +623,41 @@ def _confirm_pending_action(
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "message_send"
-        session.commit()
         if success:
             return AgentResult(reply_text="Listo, mensaje enviado.")
         return AgentResult(reply_text="No pude enviar el mensaje.")
 
     if action_type != "calendar_create":
         state.pending_action_json = None
-        session.commit()
         return None
 
     payload = pending.get("payload") or {}
     title = payload.get("title", "Sin titulo")
-    start_dt = _parse_iso_datetime(payload.get("start"))
-    end_dt = _parse_iso_datetime(payload.get("end"))
+    start_dt = _stored_datetime(payload, "start_ts", "start")
+    end_dt = _stored_datetime(payload, "end_ts", "end")
     location = payload.get("location")
     notes = payload.get("notes")
     if start_dt is None or end_dt is None:
         state.pending_action_json = None
-        session.commit()
         return AgentResult(reply_text="No pude confirmar. Reintenta.")
 
-    calendar_tool = CalendarTool()
+    calendar_tool = _get_calendar_tool()
     if not calendar_tool.has_token():
         state.last_intent = "needs_auth"
-        session.commit()
         return AgentResult(reply_text=_handle_calendar_auth_needed(session, chat_id))
 
     try:
         result = calendar_tool.create_event(title, start_dt, end_dt, location=location, notes=notes)
     except CalendarNotAuthorized:
         state.last_intent = "needs_auth"
-        session.commit()
         return AgentResult(reply_text=_handle_calendar_auth_needed(session, chat_id))
     except OAuthConfigError:
         state.last_intent = "config_error"
-        session.commit()
         return AgentResult(reply_text="Falta configurar Google Calendar.")
 
     state.pending_action_json = None
     state.pending_question_json = None
     state.last_intent = "calendar_execute"
-    session.commit()
 
     link = result.get("htmlLink")
     if link:
@@ -560,12 +666,17 @@ def _confirm_pending_action(
 
 
 def _handle_focus_commands(
-    session, state: ConversationState, folded: str | None
+    session,
+    state: ConversationState,
+    normalized: str,
+    folded: str | None,
+    now: datetime | None = None,
 ) -> AgentResult | None:
     if not folded:
         return None
 
-    if folded.startswith("autonomia on"):
+    commands = {match.lastgroup for match in _FOCUS_COMMAND_RE.finditer(folded)}
+    if "autonomy_on" in commands:
         scope = _parse_autonomy_scope(folded)
         if scope is None:
             return AgentResult(reply_text="Para que scope? calendario/mensajes/tareas")
@@ -573,77 +684,68 @@ def _handle_focus_commands(
         if hours is None:
             state.pending_question_json = {"type": "autonomy_hours", "scope": scope}
             state.last_intent = "autonomy_on"
-            session.commit()
             return AgentResult(reply_text="Por cuantas horas?")
-        _create_autonomy_rule(session, scope=scope, mode="on", hours=hours)
+        _create_autonomy_rule(session, scope=scope, mode="on", hours=hours, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "autonomy_on"
-        session.commit()
         return AgentResult(reply_text=f"Autonomia activada para {scope} por {hours} horas.")
 
-    if folded.startswith("autonomia off"):
+    if "autonomy_off" in commands:
         scope = _parse_autonomy_scope(folded)
         if scope:
-            _create_autonomy_rule(session, scope=scope, mode="off", hours=None)
+            _create_autonomy_rule(session, scope=scope, mode="off", hours=None, now=now)
             reply = f"Autonomia desactivada para {scope}."
         else:
             for scope_name in ("calendar_create", "message_reply", "tasks_manage"):
-                _create_autonomy_rule(session, scope=scope_name, mode="off", hours=None)
+                _create_autonomy_rule(session, scope=scope_name, mode="off", hours=None, now=now)
             reply = "Autonomia desactivada para todos los scopes."
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "autonomy_off"
-        session.commit()
         return AgentResult(reply_text=reply)
 
-    if "status autonomia" in folded:
-        reply = _build_autonomy_status(session)
+    if "autonomy_status" in commands:
+        reply = _build_autonomy_status(session, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "autonomy_status"
-        session.commit()
         return AgentResult(reply_text=reply)
 
-    if "status proactivo" in folded:
-        reply = _build_proactive_status(session)
+    if "proactive_status" in commands:
+        reply = _build_proactive_status(session, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "proactive_status"
-        session.commit()
         return AgentResult(reply_text=reply)
 
-    if folded.startswith("modo foco") or (
-        folded.startswith("no me jodas") and "habitos" not in folded
-    ):
+    if "focus" in commands and (folded.startswith("modo foco") or "habitos" not in folded):
         hours = _parse_int(folded)
         if hours is None:
             state.pending_question_json = {"type": "focus_hours"}
             state.last_intent = "focus_mode"
-            session.commit()
             return AgentResult(reply_text="Por cuantas horas?")
 
-        _create_autonomy_rule(session, scope="global", mode="focus", hours=hours)
+        _create_autonomy_rule(session, scope="global", mode="focus", hours=hours, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "focus_mode"
-        session.commit()
         return AgentResult(reply_text=f"Modo foco activado por {hours} horas.")
 
-    if "solo urgencias" in folded:
-        _create_autonomy_rule(session, scope="global", mode="urgencies_only", hours=None)
+    if "urgencies" in commands:
+        _create_autonomy_rule(
+            session, scope="global", mode="urgencies_only", hours=None, now=now
+        )
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "urgencies_only"
-        session.commit()
         return AgentResult(reply_text="Listo, solo urgencias.")
 
-    if folded in {"normal", "modo normal"}:
-        _create_autonomy_rule(session, scope="global", mode="normal", hours=None)
+    if "normal" in commands:
+        _create_autonomy_rule(session, scope="global", mode="normal", hours=None, now=now)
         state.pending_action_json = None
         state.pending_question_json = None
         state.last_intent = "normal"
-        session.commit()
         return AgentResult(reply_text="Modo normal activado.")
 
     return None
@@ -658,89 +760,125 @@ def _get_or_create_state(session, chat_id: str) -> ConversationState:
     return state
 
 
-def _create_autonomy_rule(session, scope: str, mode: str, hours: int | None) -> None:
+def _create_autonomy_rule(
+    session, scope: str, mode: str, hours: int | None, now: datetime | None = None
+) -> None:
     until_at = None
     if hours:
-        until_at = datetime.now(timezone.utc) + timedelta(hours=hours)
-    rule = AutonomyRule(scope=scope, mode=mode, until_at=until_at)
-    session.add(rule)
+        now_utc = now.astimezone(timezone.utc) if now else datetime.now(timezone.utc)
+        until_at = now_utc + timedelta(hours=hours)
+    _upsert_autonomy_rule(session, scope, mode, until_at)
+
 
+def _upsert_autonomy_rule(session, scope: str, mode: str, until_at: datetime | None) -> None:
+    statement = pg_insert(AutonomyRule).values(scope=scope, mode=mode, until_at=until_at)
+    session.execute(
+        statement.on_conflict_do_update(
+            index_elements=[AutonomyRule.scope],
+            set_={"mode": mode, "until_at": until_at, "created_at": func.now()},
+        )
+    )
+    session.info["autonomy_rules_changed"] = True
 
-def _parse_list_request(text: str) -> dict[str, Any] | None:
-    folded = _fold_text(text)
+
+def _parse_list_request(
+    text: str, folded: str | None = None, now: datetime | None = None
+) -> dict[str, Any] | None:
+    folded = folded if folded is not None else _fold_text(text)
     if "que tengo" not in folded and "que hay" not in folded:
         return None
 
-    day = _parse_date(folded)
+    now = now or datetime.now(TIMEZONE)
+    day = _parse_date(folded, now)
     if day is None:
-        day = datetime.now(TIMEZONE).date()
+        day = now.date()
     return {"day": day}
 
 
-def _parse_schedule_request(text: str) -> dict[str, Any] | None:
-    folded = _fold_text(text)
+def _parse_schedule_request(
+    text: str, folded: str | None = None, now: datetime | None = None
+) -> dict[str, Any] | None:
+    folded = folded if folded is not None else _fold_text(text)
     if "agend" not in folded:
         return None
 
     title = _extract_title(text)
-    start_dt = _parse_datetime(text)
-    duration = _parse_duration_with_units(text)
+    start_dt = _parse_datetime(text, folded, now=now)
+    duration = _parse_duration_with_units(text, folded)
 
     return {"title": title, "start_dt": start_dt, "duration_minutes": duration}
 
 
-def _parse_datetime(text: str) -> datetime | None:
-    folded = _fold_text(text)
-    day = _parse_date(folded)
-    if day is None:
-        return None
-
-    time_value = _parse_time(folded)
-    if time_value is None:
+def _parse_datetime(
+    text: str, folded: str | None = None, now: datetime | None = None
+) -> datetime | None:
+    folded = folded if folded is not None else _fold_text(text)
+    day, time_value = _scan_datetime(folded, now)
+    if day is None or time_value is None:
         return None
 
     return datetime.combine(day, time_value, tzinfo=TIMEZONE)
 
 
-def _parse_date(folded: str) -> date | None:
-    now = datetime.now(TIMEZONE)
-    if "manana" in folded:
-        return (now + timedelta(days=1)).date()
-    if "hoy" in folded:
-        return now.date()
+def _scan_datetime(folded: str, now: datetime | None = None) -> tuple[date | None, time | None]:
+    day_value = _relative_day(folded, now)
+    need_iso = day_value is None
+    has_colon = ":" in folded
+    clock: time | None = None
+    hour_only: time | None = None
+    for match in _DATETIME_TOKEN_RE.finditer(folded):
+        year, month, day, hour, minute, bare = match.groups()
+        if year is not None:
+            if need_iso:
+                need_iso = False
+                day_value = _iso_date(year, month, day)
+        elif bare is not None:
+            if hour_only is None and int(bare) <= 23:
+                hour_only = time(hour=int(bare))
+        elif clock is None:
+            hour_value = int(hour)
+            minute_value = int(minute)
+            if hour_value <= 23 and minute_value <= 59:
+                clock = time(hour=hour_value, minute=minute_value)
+            elif hour_only is None:
+                if hour_value <= 23:
+                    hour_only = time(hour=hour_value)
+                elif minute_value <= 23:
+                    hour_only = time(hour=minute_value)
+        if not need_iso and (clock is not None or (hour_only is not None and not has_colon)):
+            break
+    return day_value, clock or hour_only
 
-    match = re.search(r"\b(\d{4})-(\d{2})-(\d{2})\b", folded)
-    if not match:
-        return None
 
-    year = int(match.group(1))
-    month = int(match.group(2))
-    day = int(match.group(3))
-    try:
-        return date(year, month, day)
-    except ValueError:
+def _parse_date(folded: str, now: datetime | None = None) -> date | None:
+    day = _relative_day(folded, now)
+    if day is not None:
+        return day
+
+    match = _ISO_DATE_RE.search(folded)
+    if not match:
         return None
+    return _iso_date(*match.groups())
 
 
-def _parse_time(folded: str) -> time | None:
-    cleaned = re.sub(r"\b\d{4}-\d{2}-\d{2}\b", "", folded)
-    for match in re.finditer(r"\b(\d{1,2})(?::(\d{2}))\b", cleaned):
-        hour = int(match.group(1))
-        minute = int(match.group(2) or 0)
-        if 0 <= hour <= 23 and 0 <= minute <= 59:
-            return time(hour=hour, minute=minute)
+def _relative_day(folded: str, now: datetime | None = None) -> date | None:
+    if "manana" in folded:
+        return ((now or datetime.now(TIMEZONE)) + timedelta(days=1)).date()
+    if "hoy" in folded:
+        return (now or datetime.now(TIMEZONE)).date()
+    return None
 
-    for match in re.finditer(r"\b(\d{1,2})\b", cleaned):
-        hour = int(match.group(1))
-        if 0 <= hour <= 23:
-            return time(hour=hour, minute=0)
 
-    return None
+def _iso_date(year: str, month: str, day: str) -> date | None:
+    try:
+        return date(int(year), int(month), int(day))
+    except ValueError:
+        return None
 
 
-def _parse_duration_with_units(text: str) -> int | None:
-    folded = _fold_text(text)
-    match = re.search(r"\b(\d{1,3})\s*(minutos|min|m)\b", folded)
+def _parse_duration_with_units(text: str, folded: str | None = None) -> int | None:
+    folded = folded if folded is not None else _fold_text(text)
+    match = _DURATION_RE.search(folded)
     if not match:
         return None
     value = int(match.group(1))
@@ -750,7 +888,7 @@ def _parse_duration_with_units(text: str) -> int | None:
 def _parse_int(text: str | None) -> int | None:
     if not text:
         return None
-    match = re.search(r"\b(\d{1,3})\b", text)
+    match = _INT_RE.search(text)
     if not match:
         return None
     value = int(match.group(1))
@@ -758,22 +896,19 @@ def _parse_int(text: str | None) -> int | None:
 
 
 def _parse_choice(text: str) -> int | None:
-    match = re.search(r"\b([12])\b", text)
+    match = _CHOICE_RE.search(text)
     if not match:
         return None
     return int(match.group(1)) - 1
 
 
 def _extract_title(text: str) -> str:
-    match = re.search(r"\bagend\w*\b\s*(?P<rest>.+)", text, flags=re.I)
+    match = _AGEND_RE.search(text)
     rest = match.group("rest") if match else text
 
-    cleaned = re.sub(r"\b(hoy|manana)\b", "", rest, flags=re.I)
-    cleaned = re.sub(r"\b\d{4}-\d{2}-\d{2}\b", "", cleaned)
-    cleaned = re.sub(r"\b\d{1,2}(:\d{2})?\b", "", cleaned)
-    cleaned = re.sub(r"\b\d{1,3}\s*(minutos|min|m)\b", "", cleaned, flags=re.I)
-    cleaned = re.sub(r"\bpor\b", "", cleaned, flags=re.I)
-    cleaned = re.sub(r"\ba\s+las\b", "", cleaned, flags=re.I)
+    cleaned = rest
+    for pattern in _TITLE_SCRUB_RES:
+        cleaned = pattern.sub("", cleaned)
 
     title = cleaned.strip()
     return title if title else "Sin titulo"
@@ -786,6 +921,10 @@ def _normalize_text(text: str | None) -> str | None:
 
 
 def _fold_text(text: str) -> str:
+    if not text.isascii():
+        text = text.translate(_FOLD_TABLE)
+    if text.isascii():
+        return text.lower().strip()
     normalized = unicodedata.normalize("NFKD", text)
     ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
     return ascii_text.lower().strip()
@@ -801,9 +940,16 @@ def _parse_iso_datetime(value: str | None) -> datetime | None:
         return None
 
 
+def _stored_datetime(data: dict[str, Any], ts_key: str, iso_key: str) -> datetime | None:
+    timestamp = data.get(ts_key)
+    if isinstance(timestamp, (int, float)):
+        return datetime.fromtimestamp(timestamp, TIMEZONE)
+    return _parse_iso_datetime(data.get(iso_key))
+
+
 def _format_datetime(value: datetime) -> str:
-    local_value = value.astimezone(TIMEZONE)
-    return local_value.strftime("%Y-%m-%d %H:%M")
+    local = value.astimezone(TIMEZONE)
+    return f"{local.year:04d}-{local.month:02d}-{local.day:02d} {local.hour:02d}:{local.minute:02d}"
 
 
 def _format_event_line(event: dict[str, Any]) -> str:
@@ -812,14 +958,15 @@ def _format_event_line(event: dict[str, Any]) -> str:
     if start_value and "T" in start_value:
         parsed = _parse_iso_datetime(start_value)
         if parsed:
-            return f"{parsed.astimezone(TIMEZONE).strftime('%H:%M')} {summary}"
+            local = parsed.astimezone(TIMEZONE)
+            return f"{local.hour:02d}:{local.minute:02d} {summary}"
     return f"Todo el dia: {summary}"
 
 
 def _build_plan_text(payload: dict[str, Any]) -> str:
     title = payload.get("title", "Sin titulo")
-    start_dt = _parse_iso_datetime(payload.get("start"))
-    end_dt = _parse_iso_datetime(payload.get("end"))
+    start_dt = _stored_datetime(payload, "start_ts", "start")
+    end_dt = _stored_datetime(payload, "end_ts", "end")
     location = payload.get("location")
     if start_dt and end_dt:
         duration = int((end_dt - start_dt).total_seconds() / 60)
@@ -832,12 +979,26 @@ def _build_plan_text(payload: dict[str, Any]) -> str:
     return "Confirmas? (si/confirmo)"
 
 
-def _find_alternatives(calendar_tool: CalendarTool, start_dt: datetime, duration: int) -> list[datetime]:
+def _list_busy_around(
+    calendar_tool: CalendarTool, start_dt: datetime, duration: int
+) -> list[tuple[datetime, datetime]]:
+    return calendar_tool.list_busy(start_dt, start_dt + timedelta(minutes=120 + duration))
+
+
+def _slot_is_free(
+    busy: list[tuple[datetime, datetime]], start_dt: datetime, end_dt: datetime
+) -> bool:
+    idx = bisect_left(busy, (end_dt,))
+    return idx == 0 or busy[idx - 1][1] <= start_dt
+
+
+def _find_alternatives(
+    busy: list[tuple[datetime, datetime]], start_dt: datetime, duration: int
+) -> list[datetime]:
     alternatives: list[datetime] = []
     for offset in (30, 60, 90, 120):
         candidate = start_dt + timedelta(minutes=offset)
-        end_dt = candidate + timedelta(minutes=duration)
-        if calendar_tool.is_free(candidate, end_dt):
+        if _slot_is_free(busy, candidate, candidate + timedelta(minutes=duration)):
             alternatives.append(candidate)
         if len(alternatives) >= 2:
             break
@@ -856,36 +1017,37 @@ def _handle_memory_request(
     tags: list[str],
     chat_id: str,
     schedule_request: dict[str, Any] | None,
+    now: datetime | None = None,
 ) -> AgentResult | None:
     if not folded or not tags:
         return None
 
     if "de siempre" in folded or "lugar de siempre" in folded:
-        fact = _find_fact_for_tags(session, tags)
-        if fact:
+        fact_value = _find_fact_for_tags(session, tags)
+        if fact_value:
             if schedule_request is not None:
-                schedule_request["location"] = fact.value
+                schedule_request["location"] = fact_value
                 return None
             return AgentResult(
                 reply_text=(
-                    f"Tengo registrado que el lugar de siempre es {fact.value}. "
+                    f"Tengo registrado que el lugar de siempre es {fact_value}. "
                     "Queres que lo use?"
                 )
             )
-        now_local = datetime.now(TIMEZONE)
-        detector = NeedsDetector(session)
-        detector.scan(chat_id, now_local, user_text=normalized, intent_hint=None)
+        now_local = now or datetime.now(TIMEZONE)
+        _scan_needs(session, chat_id, now_local, normalized)
         request = _get_request_by_key(session, "missing_default_contact", "default_barbershop", chat_id)
         prompt = _ask_request_if_allowed(session, request, now_local)
         if prompt:
             return AgentResult(reply_text=prompt)
-        session.commit()
         label = _tag_label(tags[0])
         return AgentResult(
             reply_text=f"Ok, cuando quieras decime el {label} de siempre."
         )
 
-    if any(keyword in folded for keyword in ("recordas", "acordas", "tenes info", "tenes datos")):
+    if _contains_any(folded, _RECALL_KEYWORDS):
+        from packages.memory.service import MemoryRetriever
+
         retriever = MemoryRetriever(session)
         chunks = retriever.retrieve(normalized, tags=tags, chat_id=chat_id, limit=5)
         if not chunks:
@@ -898,12 +1060,15 @@ def _handle_memory_request(
 
 def _handle_contact_commands(
     session,
+    state: ConversationState,
+    normalized: str,
     folded: str | None,
+    now: datetime | None = None,
 ) -> AgentResult | None:
     if not folded:
         return None
 
-    match = re.match(r"^contacto\s+(.+?)\s+es\s+(proveedor|cliente|amigo|inner)\b", folded)
+    match = _CONTACT_LABEL_RE.match(folded)
     if match:
         identifier = match.group(1).strip()
         label = match.group(2).strip()
@@ -911,10 +1076,9 @@ def _handle_contact_commands(
         if contact is None:
             return AgentResult(reply_text="No encontre ese contacto. Usa el chat_id.")
         TrustEngine().apply_label(contact, label)
-        session.commit()
         return AgentResult(reply_text=f"Listo, {identifier} ahora es {label}.")
 
-    match = re.match(r"^subi confianza\s+(.+?)\s+a\s+(\d{1,3})\b", folded)
+    match = _TRUST_LEVEL_RE.match(folded)
     if match:
         identifier = match.group(1).strip()
         level = int(match.group(2))
@@ -922,27 +1086,24 @@ def _handle_contact_commands(
         if contact is None:
             return AgentResult(reply_text="No encontre ese contacto. Usa el chat_id.")
         TrustEngine().set_level(contact, level)
-        session.commit()
         return AgentResult(reply_text=f"Confianza actualizada para {identifier}.")
 
-    match = re.match(r"^auto[-\s]?reply\s+on\s+(.+)$", folded)
+    match = _AUTO_REPLY_ON_RE.match(folded)
     if match:
         identifier = match.group(1).strip()
         contact = _find_contact(session, identifier)
         if contact is None:
             return AgentResult(reply_text="No encontre ese contacto. Usa el chat_id.")
         TrustEngine().set_auto_reply(contact, True)
-        session.commit()
         return AgentResult(reply_text=f"Auto-reply activado para {identifier}.")
 
-    match = re.match(r"^auto[-\s]?reply\s+off\s+(.+)$", folded)
+    match = _AUTO_REPLY_OFF_RE.match(folded)
     if match:
         identifier = match.group(1).strip()
         contact = _find_contact(session, identifier)
         if contact is None:
             return AgentResult(reply_text="No encontre ese contacto. Usa el chat_id.")
         TrustEngine().set_auto_reply(contact, False)
-        session.commit()
         return AgentResult(reply_text=f"Auto-reply desactivado para {identifier}.")
 
     return None
@@ -950,128 +1111,164 @@ def _handle_contact_commands(
 
 def _handle_habit_commands(
     session,
-    folded: str | None,
+    state: ConversationState,
     normalized: str,
+    folded: str | None,
+    now: datetime | None = None,
 ) -> AgentResult | None:
     if not folded:
         return None
 
-    if folded == "mis habitos":
-        engine = HabitEngine(session)
-        habits = engine.list_habits(active_only=True)
-        if not habits:
-            return AgentResult(reply_text="No tenes habitos activos.")
-        lines = ["Habitos activos:"]
-        for habit in habits:
-            lines.append(f"- {habit.name} ({_format_habit_schedule(habit)})")
-        return AgentResult(reply_text="\n".join(lines))
-
-    if folded == "estado habitos":
-        engine = HabitEngine(session)
-        summary = engine.daily_summary(datetime.now(TIMEZONE))
-        done = ", ".join(summary["done"]) or "-"
-        pending = ", ".join(summary["pending"]) or "-"
-        streaks = ", ".join(summary["streaks"]) or "-"
-        reply = (
-            f"Hoy:\n- Cumplidos: {done}\n- Pendientes: {pending}\n- Rachas: {streaks}"
-        )
-        return AgentResult(reply_text=reply)
+    handler = _EXACT_HABIT_COMMANDS.get(folded)
+    if handler is None:
+        for prefix, prefix_handler in _PREFIX_HABIT_COMMANDS:
+            if folded.startswith(prefix):
+                handler = prefix_handler
+                break
+        else:
+            return None
+    return handler(session, normalized, now or datetime.now(TIMEZONE))
 
-    if folded == "resumen habitos":
-        engine = HabitEngine(session)
-        lines = engine.weekly_report(datetime.now(TIMEZONE))
-        if not lines:
-            return AgentResult(reply_text="No tenes habitos registrados.")
-        reply_lines = ["Resumen semanal:"]
-        reply_lines.extend(f"- {line}" for line in lines)
-        return AgentResult(reply_text="\n".join(reply_lines))
-
-    if folded == "subi intensidad":
-        profile = get_or_create_coaching_profile(session)
-        profile.intensity = _shift_intensity(profile.intensity, direction="up")
-        session.commit()
-        return AgentResult(reply_text=f"Intensidad actual: {profile.intensity}.")
 
-    if folded == "baja intensidad":
-        profile = get_or_create_coaching_profile(session)
-        profile.intensity = _shift_intensity(profile.intensity, direction="down")
-        session.commit()
-        return AgentResult(reply_text=f"Intensidad actual: {profile.intensity}.")
+def _habit_list(session, normalized: str, now: datetime) -> AgentResult:
+    engine = HabitEngine(session)
+    habits = engine.list_habits(active_only=True)
+    if not habits:
+        return AgentResult(reply_text="No tenes habitos activos.")
+    body = "\n".join(f"- {habit.name} ({_format_habit_schedule(habit)})" for habit in habits)
+    return AgentResult(reply_text=f"Habitos activos:\n{body}")
 
-    if folded == "no me jodas con habitos hoy":
-        end_of_day = datetime.combine(datetime.now(TIMEZONE).date(), time(23, 59), tzinfo=TIMEZONE)
-        session.add(
-            AutonomyRule(scope="habits", mode="off", until_at=end_of_day.astimezone(timezone.utc))
-        )
-        session.commit()
-        return AgentResult(reply_text="Ok, hoy no te voy a insistir con habitos.")
-
-    if folded.startswith("crear habito "):
-        raw_name = _extract_after_words(normalized, 2)
-        if not raw_name:
-            return AgentResult(reply_text="Decime el nombre del habito.")
-        schedule_info = parse_habit_text(raw_name)
-        name = _clean_habit_name(raw_name)
-        if not name:
-            return AgentResult(reply_text="Decime el nombre del habito.")
-        engine = HabitEngine(session)
-        existing = engine.find_habits_by_name(name, active_only=False)
-        if any(habit.name.lower() == name.lower() for habit in existing):
-            return AgentResult(reply_text="Ese habito ya existe.")
-        config = _get_or_create_config(session)
-        min_version = _default_min_version(name)
-        habit = engine.create_habit(
-            name=name,
-            description=None,
-            schedule_type=str(schedule_info["schedule_type"]),
-            target_per_week=schedule_info.get("target_per_week"),
-            days_of_week=schedule_info.get("days_of_week"),
-            window_start=config.strong_window_start,
-            window_end=config.strong_window_end,
-            min_version_text=min_version,
-            priority=3,
-            active=True,
-        )
-        session.commit()
-        return AgentResult(reply_text=f"Listo, cree el habito: {habit.name}.")
-
-    if folded.startswith("desactivar habito "):
-        name = _extract_after_words(normalized, 2)
-        habit, error = _resolve_habit(session, name)
-        if error:
-            return AgentResult(reply_text=error)
-        habit.active = False
-        session.commit()
-        return AgentResult(reply_text=f"Habito desactivado: {habit.name}.")
-
-    if folded.startswith("hecho "):
-        name = _extract_after_words(normalized, 1)
-        habit, error = _resolve_habit(session, name)
-        if error:
-            return AgentResult(reply_text=error)
-        engine = HabitEngine(session)
-        engine.log_done(habit.id, now=datetime.now(TIMEZONE))
-        streak = engine.current_streak(habit.id, datetime.now(TIMEZONE))
-        session.commit()
-        return AgentResult(reply_text=f"Listo, registre {habit.name}. Racha: {streak}d.")
-
-    if folded.startswith("no hoy "):
-        name = _extract_after_words(normalized, 2)
-        habit, error = _resolve_habit(session, name)
-        if error:
-            return AgentResult(reply_text=error)
-        engine = HabitEngine(session)
-        engine.log_skip(habit.id, now=datetime.now(TIMEZONE))
-        session.commit()
-        return AgentResult(reply_text=f"Ok, marcado como no hoy: {habit.name}.")
 
-    return None
+def _habit_status(session, normalized: str, now: datetime) -> AgentResult:
+    engine = HabitEngine(session)
+    summary = engine.daily_summary(now)
+    done = ", ".join(summary["done"]) or "-"
+    pending = ", ".join(summary["pending"]) or "-"
+    streaks = ", ".join(summary["streaks"]) or "-"
+    reply = f"Hoy:\n- Cumplidos: {done}\n- Pendientes: {pending}\n- Rachas: {streaks}"
+    return AgentResult(reply_text=reply)
+
+
+def _habit_weekly_report(session, normalized: str, now: datetime) -> AgentResult:
+    engine = HabitEngine(session)
+    lines = engine.weekly_report(now)
+    if not lines:
+        return AgentResult(reply_text="No tenes habitos registrados.")
+    body = "\n".join(f"- {line}" for line in lines)
+    return AgentResult(reply_text=f"Resumen semanal:\n{body}")
+
+
+def _habit_intensity_up(session, normalized: str, now: datetime) -> AgentResult:
+    profile = get_or_create_coaching_profile(session)
+    profile.intensity = _shift_intensity(profile.intensity, direction="up")
+    return AgentResult(reply_text=f"Intensidad actual: {profile.intensity}.")
+
+
+def _habit_intensity_down(session, normalized: str, now: datetime) -> AgentResult:
+    profile = get_or_create_coaching_profile(session)
+    profile.intensity = _shift_intensity(profile.intensity, direction="down")
+    return AgentResult(reply_text=f"Intensidad actual: {profile.intensity}.")
+
+
+def _habit_snooze_today(session, normalized: str, now: datetime) -> AgentResult:
+    end_of_day = datetime.combine(now.date(), time(23, 59), tzinfo=TIMEZONE)
+    _upsert_autonomy_rule(session, "habits", "off", end_of_day.astimezone(timezone.utc))
+    return AgentResult(reply_text="Ok, hoy no te voy a insistir con habitos.")
 
 
-def _resolve_habit(session, name: str | None) -> tuple[Habit | None, str | None]:
+def _habit_create(session, normalized: str, now: datetime) -> AgentResult:
+    raw_name = _extract_after_words(normalized, 2)
+    if not raw_name:
+        return AgentResult(reply_text="Decime el nombre del habito.")
+    schedule_info = parse_habit_text(raw_name)
+    name = _clean_habit_name(raw_name)
     if not name:
-        return None, "Decime el habito."
+        return AgentResult(reply_text="Decime el nombre del habito.")
+    engine = HabitEngine(session)
+    existing = engine.find_habits_by_name(name, active_only=False)
+    if any(habit.name.lower() == name.lower() for habit in existing):
+        return AgentResult(reply_text="Ese habito ya existe.")
+    config = _get_or_create_config(session)
+    min_version = _default_min_version(name)
+    habit = engine.create_habit(
+        name=name,
+        description=None,
+        schedule_type=str(schedule_info["schedule_type"]),
+        target_per_week=schedule_info.get("target_per_week"),
+        days_of_week=schedule_info.get("days_of_week"),
+        window_start=config.strong_window_start,
+        window_end=config.strong_window_end,
+        min_version_text=min_version,
+        priority=3,
+        active=True,
+    )
+    return AgentResult(reply_text=f"Listo, cree el habito: {habit.name}.")
+
+
+def _habit_deactivate(session, normalized: str, now: datetime) -> AgentResult:
+    name = _extract_after_words(normalized, 2)
+    habit, error = _resolve_habit(HabitEngine(session), name)
+    if error:
+        return AgentResult(reply_text=error)
+    habit.active = False
+    return AgentResult(reply_text=f"Habito desactivado: {habit.name}.")
+
+
+def _habit_done(session, normalized: str, now: datetime) -> AgentResult:
+    name = _extract_after_words(normalized, 1)
+    engine = HabitEngine(session)
+    habit, error = _resolve_habit(engine, name)
+    if error:
+        return AgentResult(reply_text=error)
+    engine.log_done(habit.id, now=now)
+    streak = engine.current_streak(habit.id, now)
+    return AgentResult(reply_text=f"Listo, registre {habit.name}. Racha: {streak}d.")
+
+
+def _habit_skip(session, normalized: str, now: datetime) -> AgentResult:
+    name = _extract_after_words(normalized, 2)
     engine = HabitEngine(session)
+    habit, error = _resolve_habit(engine, name)
+    if error:
+        return AgentResult(reply_text=error)
+    engine.log_skip(habit.id, now=now)
+    return AgentResult(reply_text=f"Ok, marcado como no hoy: {habit.name}.")
+
+
+_EXACT_HABIT_COMMANDS = {
+    "mis habitos": _habit_list,
+    "estado habitos": _habit_status,
+    "resumen habitos": _habit_weekly_report,
+    "subi intensidad": _habit_intensity_up,
+    "baja intensidad": _habit_intensity_down,
+    "no me jodas con habitos hoy": _habit_snooze_today,
+}
+_PREFIX_HABIT_COMMANDS = (
+    ("crear habito ", _habit_create),
+    ("desactivar habito ", _habit_deactivate),
+    ("hecho ", _habit_done),
+    ("no hoy ", _habit_skip),
+)
+_HABIT_TRIGGER_RE = re.compile(
+    "^(?:"
+    + "|".join(
+        [re.escape(command) + r"\Z" for command in _EXACT_HABIT_COMMANDS]
+        + [re.escape(prefix) for prefix, _ in _PREFIX_HABIT_COMMANDS]
+    )
+    + ")"
+)
+
+
+_COMMAND_ROUTES = (
+    (_FOCUS_COMMAND_RE, _handle_focus_commands),
+    (_CONTACT_TRIGGER_RE, _handle_contact_commands),
+    (_HABIT_TRIGGER_RE, _handle_habit_commands),
+)
+
+
+def _resolve_habit(engine: HabitEngine, name: str | None) -> tuple[Habit | None, str | None]:
+    if not name:
+        return None, "Decime el habito."
     matches = engine.find_habits_by_name(name)
     if not matches:
         return None, "No encontre ese habito."
@@ -1092,9 +1289,7 @@ def _format_habit_schedule(habit) -> str:
     if habit.schedule_type == "weekly" and habit.target_per_week:
         return f"{habit.target_per_week} por semana"
     if habit.schedule_type == "scheduled" and habit.days_of_week:
-        labels = ["lun", "mar", "mie", "jue", "vie", "sab", "dom"]
-        days = ",".join(labels[idx] for idx in habit.days_of_week if idx < len(labels))
-        return f"{days}"
+        return ",".join(_DOW_LABELS[idx] for idx in habit.days_of_week if idx < len(_DOW_LABELS))
     return "diario"
 
 
@@ -1103,14 +1298,7 @@ def _default_min_version(name: str) -> str:
 
 
 def _clean_habit_name(text: str) -> str:
-    cleaned = re.sub(r"\b\d+\s*veces\s*por\s*semana\b", "", text, flags=re.I)
-    cleaned = re.sub(
-        r"\b(lunes|martes|miercoles|jueves|viernes|sabado|domingo|lun|mar|mie|jue|vie|sab|dom)\b",
-        "",
-        cleaned,
-        flags=re.I,
-    )
-    return " ".join(cleaned.split()).strip()
+    return " ".join(_HABIT_SCHEDULE_RE.sub(" ", text).split())
 
 
 def _shift_intensity(value: str, direction: str) -> str:
@@ -1126,11 +1314,17 @@ def _shift_intensity(value: str, direction: str) -> str:
 
 def _find_contact(session, identifier: str) -> Contact | None:
     if "@" in identifier:
-        return session.query(Contact).filter_by(chat_id=identifier).one_or_none()
+        return session.execute(
+            select(Contact).where(Contact.chat_id == identifier)
+        ).scalar_one_or_none()
 
     matches = (
-        session.query(Contact)
-        .filter(Contact.display_name.ilike(f"%{identifier}%"))
+        session.execute(
+            select(Contact)
+            .where(Contact.display_name.ilike(f"%{_escape_like(identifier)}%", escape="\\"))
+            .limit(2)
+        )
+        .scalars()
         .all()
     )
     if len(matches) == 1:
@@ -1138,58 +1332,66 @@ def _find_contact(session, identifier: str) -> Contact | None:
     return None
 
 
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+@lru_cache(maxsize=1)
+def _get_calendar_tool() -> CalendarTool:
+    return CalendarTool()
+
+
 def _calendar_auth_missing() -> bool:
     try:
-        return not CalendarTool().has_token()
+        return not _get_calendar_tool().has_token()
     except Exception:
         return True
 
 
-def _handle_calendar_auth_needed(session, chat_id: str) -> str:
-    now_local = datetime.now(TIMEZONE)
-    detector = NeedsDetector(session)
-    detector.scan(chat_id, now_local, user_text="calendario", intent_hint={"calendar_intent": True})
+def _scan_needs(
+    session, chat_id: str, now_local: datetime, user_text: str, calendar_intent: bool = False
+) -> None:
+    scanned = session.info.setdefault("needs_scanned", set())
+    key = (chat_id, user_text, calendar_intent)
+    if key in scanned:
+        return
+    scanned.add(key)
+    intent_hint = {"calendar_intent": True} if calendar_intent else None
+    NeedsDetector(session).scan(chat_id, now_local, user_text=user_text, intent_hint=intent_hint)
+
+
+def _handle_calendar_auth_needed(session, chat_id: str, now: datetime | None = None) -> str:
+    now_local = now or datetime.now(TIMEZONE)
+    _scan_needs(session, chat_id, now_local, "calendario", calendar_intent=True)
     request = _get_request_by_key(session, "authorize_calendar", "calendar_auth", chat_id)
     prompt = _ask_request_if_allowed(session, request, now_local)
     if prompt:
         return prompt
-    session.commit()
     return _auth_message()
 
 
-def _maybe_ask_request(
-    session,
-    state: ConversationState,
-    chat_id: str,
-    normalized: str,
-) -> str | None:
+def _maybe_ask_request(session, state: ConversationState, ctx: MessageContext) -> str | None:
     if state.pending_action_json or state.pending_question_json:
         return None
-    if get_active_request(session, chat_id):
+    if get_active_request(session, ctx.chat_id):
         return None
-    if _should_skip_request_prompt(normalized):
-        now_local = datetime.now(TIMEZONE)
-        detector = NeedsDetector(session)
-        detector.scan(chat_id, now_local, user_text=normalized, intent_hint=None)
-        session.commit()
+    _scan_needs(session, ctx.chat_id, ctx.now_local, ctx.normalized)
+    if _should_skip_request_prompt(ctx.folded):
         return None
 
-    now_local = datetime.now(TIMEZONE)
-    detector = NeedsDetector(session)
-    detector.scan(chat_id, now_local, user_text=normalized, intent_hint=None)
-
-    open_requests = get_open_requests(session, chat_id, limit=5)
+    open_requests = get_open_requests(session, ctx.chat_id, limit=5)
+    if not open_requests:
+        return None
+    policy_inputs = _request_policy_inputs(session, ctx.now_local)
     for request in open_requests:
-        prompt = _ask_request_if_allowed(session, request, now_local)
+        prompt = _ask_request_if_allowed(session, request, ctx.now_local, policy_inputs)
         if prompt:
             return prompt
 
-    session.commit()
     return None
 
 
-def _should_skip_request_prompt(text: str) -> bool:
-    folded = _fold_text(text)
+def _should_skip_request_prompt(folded: str) -> bool:
     if not folded:
         return True
     greetings = {"hola", "buenas", "buen dia", "buenas tardes", "buenas noches", "ok"}
@@ -1199,95 +1401,101 @@ def _should_skip_request_prompt(text: str) -> bool:
 
 
 def _ask_request_if_allowed(
-    session, request, now_local: datetime
+    session,
+    request,
+    now_local: datetime,
+    policy_inputs: tuple[SystemConfig, str, int] | None = None,
 ) -> str | None:
     if request is None:
         return None
 
-    config = _get_or_create_config(session)
-    autonomy_mode, _ = _get_autonomy_mode(session)
-    day_start = datetime.combine(now_local.date(), time(0, 0), tzinfo=TIMEZONE)
-    day_end = day_start + timedelta(days=1)
-    asked_today = count_requests_asked_today(session, day_start, day_end)
+    config, autonomy_mode, asked_today = policy_inputs or _request_policy_inputs(session, now_local)
     policy = RequestPolicy()
     if policy.should_ask(request, now_local, autonomy_mode, config, asked_today):
         mark_request_asked(session, request, now_local)
-        session.commit()
         return request.prompt
     return None
 
 
+def _request_policy_inputs(session, now_local: datetime) -> tuple[SystemConfig, str, int]:
+    config = _get_or_create_config(session)
+    autonomy_mode, _ = _get_autonomy_mode(session)
+    day_start, day_end = _day_bounds(now_local.date())
+    return config, autonomy_mode, count_requests_asked_today(session, day_start, day_end)
+
+
+def _day_bounds(day: date) -> tuple[datetime, datetime]:
+    global _day_bounds_cache
+    cached = _day_bounds_cache
+    if cached is not None and cached[0] == day:
+        return cached[1], cached[2]
+    day_start = datetime.combine(day, time(0, 0), tzinfo=TIMEZONE)
+    day_end = day_start + timedelta(days=1)
+    _day_bounds_cache = (day, day_start, day_end)
+    return day_start, day_end
+
+
 def _get_request_by_key(session, request_type: str, key: str, chat_id: str):
-    dedupe_key = f"{request_type}:{key}:{chat_id}"
-    return session.query(AssistantRequest).filter_by(dedupe_key=dedupe_key).one_or_none()
+    dedupe_key = build_dedupe_key(request_type, key, chat_id)
+    return session.execute(
+        select(AssistantRequest).where(AssistantRequest.dedupe_key == dedupe_key)
+    ).scalar_one_or_none()
 
 
-def _find_fact_for_tags(session, tags: list[str]) -> MemoryFact | None:
+def _find_fact_for_tags(session, tags: list[str]) -> str | None:
+    keys: list[str] = []
     for tag in tags:
         if tag == "peluqueria":
-            fact = (
-                session.query(MemoryFact)
-                .filter(
-                    MemoryFact.subject == "user",
-                    MemoryFact.key == "default_barbershop",
-                    MemoryFact.confidence >= 70,
-                )
-                .one_or_none()
-            )
-            if fact:
-                return fact
-        for key in (f"{tag}_default", f"{tag}_lugar"):
-            fact = (
-                session.query(MemoryFact)
-                .filter(
-                    MemoryFact.subject == "user",
-                    MemoryFact.key == key,
-                    MemoryFact.confidence >= 70,
-                )
-                .one_or_none()
-            )
-            if fact:
-                return fact
+            keys.append("default_barbershop")
+        keys.extend((f"{tag}_default", f"{tag}_lugar"))
+    if not keys:
+        return None
+
+    rows = session.execute(
+        select(MemoryFact.key, MemoryFact.value).where(
+            MemoryFact.subject == "user",
+            MemoryFact.key.in_(keys),
+            MemoryFact.confidence >= 70,
+        )
+    )
+    values = dict(rows.all())
+    for key in keys:
+        if key in values:
+            return values[key]
     return None
 
 
 def _tag_label(tag: str) -> str:
-    labels = {
-        "peluqueria": "peluqueria",
-        "fletes": "servicio de fletes",
-        "camionetas": "camioneta",
-        "ascend": "dietetica",
-        "agenda": "agenda",
-    }
-    return labels.get(tag, tag)
+    return _TAG_LABELS.get(tag, tag)
 
 
 def _format_chunk_summary(chunks) -> list[str]:
-    summaries: list[str] = []
-    for chunk in chunks:
-        content = chunk.content.strip().replace("\n", " ")
-        if len(content) > 120:
-            content = content[:117] + "..."
-        summaries.append(f"[{chunk.source_type}] {content}")
-    return summaries
+    return [_format_chunk_line(chunk) for chunk in chunks]
+
+
+def _format_chunk_line(chunk) -> str:
+    content = chunk.content.strip().replace("\n", " ")
+    if len(content) > 120:
+        return f"[{chunk.source_type}] {content[:117]}..."
+    return f"[{chunk.source_type}] {content}"
 
 
 def _handle_llm_planner(
-    session,
-    state: ConversationState,
-    user_text: str,
-    chat_id: str,
+    session, state: ConversationState, ctx: MessageContext
 ) -> AgentResult | None:
-    if not _should_use_llm(user_text):
+    if not _should_use_llm(ctx.folded):
         return None
-    context = ContextBuilder(session).build(chat_id, user_text, intent_hint=None)
+    from packages.llm.client import LlmClient, load_llm_config
+    from packages.llm.context_builder import ContextBuilder
+    from packages.llm.supervisor import Supervisor
+    from packages.llm.tools_registry import execute_tool, get_tool_scope
+    from packages.relations.policy import ContactPolicy
+
+    chat_id = ctx.chat_id
+    context = ContextBuilder(session).build(chat_id, ctx.normalized, intent_hint=None)
     config = _get_or_create_config(session)
     llm_client = LlmClient(load_llm_config(config))
-    planner_output = llm_client.generate_structured(
-        _build_llm_system_prompt(),
-        user_text,
-        context.prompt,
-    )
+    planner_output = _generate_plan(llm_client, ctx.normalized, context.prompt)
     state.last_intent = planner_output.intent
 
     decision = Supervisor(
@@ -1305,17 +1513,15 @@ def _handle_llm_planner(
                 "end": action.input.get("end"),
                 "location": action.input.get("location"),
                 "notes": action.input.get("notes"),
-                "timezone": TIMEZONE.key,
+                "timezone": _TZ_KEY,
             }
             state.pending_action_json = {"type": "calendar_create", "payload": payload}
             state.pending_question_json = None
             state.last_intent = "llm_plan"
-            session.commit()
         if action.tool == "message.send":
             state.pending_action_json = {"type": "message_send", "payload": action.input}
             state.pending_question_json = None
             state.last_intent = "llm_plan"
-            session.commit()
         return AgentResult(reply_text=decision.reply)
 
     if decision.action and not decision.requires_confirmation:
@@ -1366,11 +1572,9 @@ def _handle_llm_planner(
             link = output_json.get("htmlLink")
             if link:
                 reply = f"{reply} {link}"
-        session.commit()
         return AgentResult(reply_text=reply)
 
     if decision.reply:
-        session.commit()
         return AgentResult(reply_text=decision.reply)
     return None
 
@@ -1384,8 +1588,7 @@ def _send_and_return(chat_id: str, text: str) -> dict[str, Any]:
     return response
 
 
-def _should_use_llm(text: str) -> bool:
-    folded = _fold_text(text)
+def _should_use_llm(folded: str) -> bool:
     if not folded:
         return False
     greetings = {"hola", "buenas", "buen dia", "buenas tardes", "buenas noches"}
@@ -1393,20 +1596,14 @@ def _should_use_llm(text: str) -> bool:
         return False
     if len(folded.split()) <= 1:
         return False
-    keywords = (
-        "agend",
-        "agenda",
-        "crear",
-        "evento",
-        "calendario",
-        "recorda",
-        "recordar",
-        "turno",
-        "necesito",
-        "queres",
-        "pod",
-    )
-    return any(keyword in folded for keyword in keywords)
+    return _contains_any(folded, _LLM_KEYWORDS)
+
+
+def _contains_any(text: str, keywords: tuple[str, ...]) -> bool:
+    for keyword in keywords:
+        if keyword in text:
+            return True
+    return False
 
 
 def _log_tool_run(
@@ -1431,10 +1628,45 @@ def _log_tool_run(
         autonomy_mode_snapshot=autonomy_snapshot,
     )
     session.add(run)
-    session.commit()
 
 
+def clear_plan_cache() -> None:
+    with _plan_cache_lock:
+        _plan_cache.clear()
+
+
+def _generate_plan(llm_client: LlmClient, user_text: str, context_prompt: str) -> PlannerOutput:
+    key = hashlib.blake2b(
+        "\x00".join((llm_client.config.model_name, user_text, context_prompt)).encode(),
+        digest_size=16,
+    ).digest()
+    now = monotonic()
+    with _plan_cache_lock:
+        cached = _plan_cache.get(key)
+        if cached is not None and now - cached[0] < PLAN_CACHE_TTL_SECONDS:
+            _plan_cache.move_to_end(key)
+            return cached[1]
+
+    from packages.llm.schema import fallback_output
+
+    planner_output = llm_client.generate_structured(
+        _build_llm_system_prompt(),
+        user_text,
+        context_prompt,
+    )
+    if planner_output != fallback_output():
+        with _plan_cache_lock:
+            _plan_cache[key] = (now, planner_output)
+            _plan_cache.move_to_end(key)
+            while len(_plan_cache) > PLAN_CACHE_MAX_ENTRIES:
+                _plan_cache.popitem(last=False)
+    return planner_output
+
+
+@lru_cache(maxsize=1)
 def _build_llm_system_prompt() -> str:
+    from packages.llm.tools_registry import get_tool_names
+
     tool_list = ", ".join(sorted(get_tool_names()))
     return (
         "Sos un planner que responde SOLO JSON estricto. "
@@ -1452,18 +1684,14 @@ def _build_llm_system_prompt() -> str:
     )
 
 
-def _build_proactive_status(session) -> str:
+def _build_proactive_status(session, now: datetime | None = None) -> str:
     config = _get_or_create_config(session)
     mode, until_at = _get_autonomy_mode(session)
-    mode_label = {
-        "normal": "normal",
-        "focus": "foco",
-        "urgencies_only": "solo urgencias",
-    }.get(mode, mode)
+    mode_label = _MODE_LABELS.get(mode, mode)
 
     parts = [f"Modo proactivo: {mode_label}.", f"Limite diario: {config.daily_proactive_limit}."]
     if mode == "focus" and until_at:
-        remaining = until_at - datetime.now(timezone.utc)
+        remaining = until_at - (now or datetime.now(timezone.utc))
         if remaining.total_seconds() > 0:
             hours = int(remaining.total_seconds() // 3600)
             minutes = int((remaining.total_seconds() % 3600) // 60)
@@ -1471,34 +1699,30 @@ def _build_proactive_status(session) -> str:
     return " ".join(parts)
 
 
-def _build_autonomy_status(session) -> str:
-    now_utc = datetime.now(timezone.utc)
+def _build_autonomy_status(session, now: datetime | None = None) -> str:
+    now_utc = now.astimezone(timezone.utc) if now else datetime.now(timezone.utc)
     scopes = ["calendar_create", "message_reply", "tasks_manage"]
-    lines = []
-    for scope in scopes:
-        rule = (
-            session.query(AutonomyRule)
-            .filter(AutonomyRule.scope == scope)
-            .order_by(AutonomyRule.created_at.desc())
-            .first()
+    rules = session.execute(
+        select(AutonomyRule.scope, AutonomyRule.mode, AutonomyRule.until_at).where(
+            AutonomyRule.scope.in_(scopes)
         )
-        if rule and rule.until_at and rule.until_at < now_utc:
-            status = "off"
-            remaining = None
-        elif rule:
-            status = rule.mode
-            remaining = rule.until_at
-        else:
-            status = "off"
-            remaining = None
-        if remaining:
-            delta = remaining - now_utc
-            hours = int(delta.total_seconds() // 3600)
-            minutes = int((delta.total_seconds() % 3600) // 60)
-            lines.append(f"{scope}: {status} ({hours}h {minutes}m)")
-        else:
-            lines.append(f"{scope}: {status}")
-    return "Autonomia: " + ", ".join(lines)
+    )
+    rules_by_scope = {rule.scope: rule for rule in rules}
+    body = ", ".join(
+        _format_autonomy_scope(scope, rules_by_scope.get(scope), now_utc) for scope in scopes
+    )
+    return f"Autonomia: {body}"
+
+
+def _format_autonomy_scope(scope: str, rule, now_utc: datetime) -> str:
+    if rule is None or (rule.until_at and rule.until_at < now_utc):
+        return f"{scope}: off"
+    if not rule.until_at:
+        return f"{scope}: {rule.mode}"
+    delta = rule.until_at - now_utc
+    hours = int(delta.total_seconds() // 3600)
+    minutes = int((delta.total_seconds() % 3600) // 60)
+    return f"{scope}: {rule.mode} ({hours}h {minutes}m)"
 
 
 def _parse_autonomy_scope(folded: str) -> str | None:
@@ -1511,10 +1735,53 @@ def _parse_autonomy_scope(folded: str) -> str | None:
     return None
 
 
+def clear_config_cache() -> None:
+    global _config_cache, _autonomy_mode_cache
+    _config_cache = None
+    _autonomy_mode_cache = None
+
+
+@event.listens_for(SessionLocal, "before_flush")
+def _flag_system_config_changes(session, flush_context, instances) -> None:
+    for obj in (*session.new, *session.dirty, *session.deleted):
+        if isinstance(obj, SystemConfig):
+            session.info["system_config_changed"] = True
+            return
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _clear_autonomy_mode_on_commit(session) -> None:
+    global _autonomy_mode_cache, _config_cache
+    if session.info.pop("autonomy_rules_changed", False):
+        _autonomy_mode_cache = None
+    if session.info.pop("system_config_changed", False):
+        _config_cache = None
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_cache_change_flags(session) -> None:
+    session.info.pop("autonomy_rules_changed", None)
+    session.info.pop("system_config_changed", None)
+
+
 def _get_or_create_config(session) -> SystemConfig:
-    config = session.query(SystemConfig).order_by(SystemConfig.id.asc()).first()
-    if config:
-        return config
+    global _config_cache
+    if _config_cache is not None and monotonic() - _config_cache[0] < CONFIG_CACHE_TTL_SECONDS:
+        return _config_cache[1]
+
+    config = session.execute(
+        select(SystemConfig).order_by(SystemConfig.id.asc()).limit(1)
+    ).scalar_one_or_none()
+    if config is None:
+        config = _create_default_config(session)
+    snapshot = SystemConfig(
+        **{attr.key: getattr(config, attr.key) for attr in inspect(SystemConfig).column_attrs}
+    )
+    _config_cache = (monotonic(), snapshot)
+    return snapshot
+
+
+def _create_default_config(session) -> SystemConfig:
     config = SystemConfig(
         quiet_hours_start=time(0, 0),
         quiet_hours_end=time(9, 30),
@@ -1532,20 +1799,30 @@ def _get_or_create_config(session) -> SystemConfig:
         llm_json_mode=True,
     )
     session.add(config)
-    session.commit()
+    session.flush()
     return config
 
 
 def _get_autonomy_mode(session) -> tuple[str, datetime | None]:
-    rules = (
-        session.query(AutonomyRule)
-        .filter(AutonomyRule.scope == "global")
-        .order_by(AutonomyRule.created_at.desc())
-        .all()
-    )
+    global _autonomy_mode_cache
     now_utc = datetime.now(timezone.utc)
-    for rule in rules:
-        if rule.until_at and rule.until_at < now_utc:
-            continue
-        return rule.mode, rule.until_at
-    return "normal", None
+    cached = _autonomy_mode_cache
+    if (
+        cached is not None
+        and monotonic() - cached[0] < CONFIG_CACHE_TTL_SECONDS
+        and (cached[2] is None or cached[2] >= now_utc)
+    ):
+        return cached[1], cached[2]
+
+    rule = session.execute(
+        select(AutonomyRule.mode, AutonomyRule.until_at)
+        .where(
+            AutonomyRule.scope == "global",
+            or_(AutonomyRule.until_at.is_(None), AutonomyRule.until_at >= now_utc),
+        )
+        .order_by(AutonomyRule.created_at.desc())
+        .limit(1)
+    ).first()
+    mode, until_at = (rule.mode, rule.until_at) if rule is not None else ("normal", None)
+    _autonomy_mode_cache = (monotonic(), mode, until_at)
+    return mode, until_at
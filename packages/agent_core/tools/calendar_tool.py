@@ -1,6 +1,10 @@
 from __future__ import annotations
 
 from datetime import datetime
+import logging
+import queue
+import threading
+from time import monotonic
 from typing import Any
 
 from google.auth.transport.requests import Request
@@ -17,6 +21,17 @@ from packages.agent_core.tools.google_oauth import (
 from packages.db.database import SessionLocal
 from packages.db.models import ToolRun
 
+logger = logging.getLogger(__name__)
+
+TOOL_RUN_QUEUE_MAX_ENTRIES = 1000
+TOOL_RUN_BATCH_SIZE = 50
+TOOL_RUN_BATCH_WAIT_SECONDS = 0.2
+
+_tool_run_queue: queue.Queue[dict[str, Any]] = queue.Queue(maxsize=TOOL_RUN_QUEUE_MAX_ENTRIES)
+_tool_run_writer: threading.Thread | None = None
+_tool_run_writer_lock = threading.Lock()
+dropped_tool_runs = 0
+
 
 class CalendarNotAuthorized(RuntimeError):
     pass
@@ -32,6 +47,7 @@ class CalendarTool:
         self.calendar_id = calendar_id
         self.log_runs = log_runs
         self.audit_context = audit_context or {}
+        self._local = threading.local()
 
     def list_events(self, time_min: datetime, time_max: datetime) -> list[dict[str, Any]]:
         input_payload = {
@@ -53,19 +69,7 @@ class CalendarTool:
                 .execute()
             )
             events = events_result.get("items", [])
-            payload = [
-                {
-                    "id": event.get("id"),
-                    "summary": event.get("summary"),
-                    "start": event.get("start", {}).get("dateTime")
-                    or event.get("start", {}).get("date"),
-                    "end": event.get("end", {}).get("dateTime")
-                    or event.get("end", {}).get("date"),
-                    "location": event.get("location"),
-                    "htmlLink": event.get("htmlLink"),
-                }
-                for event in events
-            ]
+            payload = [_event_payload(event) for event in events]
             self._log_tool_run("calendar.list_events", input_payload, payload, "success")
             return payload
         except Exception as exc:
@@ -84,6 +88,45 @@ class CalendarTool:
         self._log_tool_run("calendar.is_free", input_payload, {"is_free": is_free}, "success")
         return is_free
 
+    def list_busy(self, start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+        input_payload = {"start": start.isoformat(), "end": end.isoformat()}
+        try:
+            service = self._get_service()
+            response = (
+                service.freebusy()
+                .query(
+                    body={
+                        "timeMin": start.isoformat(),
+                        "timeMax": end.isoformat(),
+                        "items": [{"id": self.calendar_id}],
+                    }
+                )
+                .execute()
+            )
+            periods = response.get("calendars", {}).get(self.calendar_id, {}).get("busy", [])
+            intervals = sorted(
+                (datetime.fromisoformat(period["start"]), datetime.fromisoformat(period["end"]))
+                for period in periods
+            )
+            busy: list[tuple[datetime, datetime]] = []
+            for busy_start, busy_end in intervals:
+                if busy and busy_start <= busy[-1][1]:
+                    busy[-1] = (busy[-1][0], max(busy[-1][1], busy_end))
+                else:
+                    busy.append((busy_start, busy_end))
+            self._log_tool_run(
+                "calendar.list_busy", input_payload, {"busy_count": len(busy)}, "success"
+            )
+            return busy
+        except Exception as exc:
+            self._log_tool_run(
+                "calendar.list_busy",
+                input_payload,
+                {"error": exc.__class__.__name__},
+                "error",
+            )
+            raise
+
     def create_event(
         self,
         title: str,
@@ -100,10 +143,12 @@ class CalendarTool:
             "notes": notes,
         }
 
+        start_tz = _tz_key(start)
+        end_tz = start_tz if end.tzinfo is start.tzinfo else _tz_key(end)
         event_body: dict[str, Any] = {
             "summary": title,
-            "start": {"dateTime": start.isoformat(), "timeZone": _tz_key(start)},
-            "end": {"dateTime": end.isoformat(), "timeZone": _tz_key(end)},
+            "start": {"dateTime": start.isoformat(), "timeZone": start_tz},
+            "end": {"dateTime": end.isoformat(), "timeZone": end_tz},
         }
         if location:
             event_body["location"] = location
@@ -131,7 +176,12 @@ class CalendarTool:
 
     def _get_service(self):
         credentials = self._get_credentials()
-        return build("calendar", "v3", credentials=credentials, cache_discovery=False)
+        cached = getattr(self._local, "service", None)
+        if cached is not None and cached[0] == credentials.token:
+            return cached[1]
+        service = build("calendar", "v3", credentials=credentials, cache_discovery=False)
+        self._local.service = (credentials.token, service)
+        return service
 
     def _get_credentials(self) -> Credentials:
         token_data = load_token()
@@ -157,19 +207,75 @@ class CalendarTool:
     ) -> None:
         if not self.log_runs:
             return
-        with SessionLocal() as session:
-            run = ToolRun(
-                tool_name=tool_name,
-                status=status,
-                input_json=input_json,
-                output_json=output_json,
-                decision_source=self.audit_context.get("decision_source"),
-                requested_by=self.audit_context.get("requested_by"),
-                risk_level=self.audit_context.get("risk_level"),
-                autonomy_mode_snapshot=self.audit_context.get("autonomy_mode_snapshot"),
+        _enqueue_tool_run(
+            {
+                "tool_name": tool_name,
+                "status": status,
+                "input_json": input_json,
+                "output_json": output_json,
+                "decision_source": self.audit_context.get("decision_source"),
+                "requested_by": self.audit_context.get("requested_by"),
+                "risk_level": self.audit_context.get("risk_level"),
+                "autonomy_mode_snapshot": self.audit_context.get("autonomy_mode_snapshot"),
+            }
+        )
+
+
+def flush_tool_runs() -> None:
+    _tool_run_queue.join()
+
+
+def _enqueue_tool_run(values: dict[str, Any]) -> None:
+    global _tool_run_writer, dropped_tool_runs
+    if _tool_run_writer is None:
+        with _tool_run_writer_lock:
+            if _tool_run_writer is None:
+                _tool_run_writer = threading.Thread(
+                    target=_write_tool_runs, name="tool-run-writer", daemon=True
+                )
+                _tool_run_writer.start()
+    try:
+        _tool_run_queue.put_nowait(values)
+    except queue.Full:
+        dropped_tool_runs += 1
+
+
+def _write_tool_runs() -> None:
+    while True:
+        batch = [_tool_run_queue.get()]
+        deadline = monotonic() + TOOL_RUN_BATCH_WAIT_SECONDS
+        while len(batch) < TOOL_RUN_BATCH_SIZE:
+            remaining = deadline - monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_tool_run_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        try:
+            with SessionLocal() as session:
+                session.add_all([ToolRun(**values) for values in batch])
+                session.commit()
+        except Exception as exc:
+            logger.warning(
+                "ToolRun batch insert failed (%s rows): %s", len(batch), exc.__class__.__name__
             )
-            session.add(run)
-            session.commit()
+        finally:
+            for _ in batch:
+                _tool_run_queue.task_done()
+
+
+def _event_payload(event: dict[str, Any]) -> dict[str, Any]:
+    start = event.get("start") or {}
+    end = event.get("end") or {}
+    return {
+        "id": event.get("id"),
+        "summary": event.get("summary"),
+        "start": start.get("dateTime") or start.get("date"),
+        "end": end.get("dateTime") or end.get("date"),
+        "location": event.get("location"),
+        "htmlLink": event.get("htmlLink"),
+    }
 
 
 def _tz_key(dt: datetime) -> str:
@@ -1,12 +1,15 @@
 from __future__ import annotations
 
 from datetime import timezone
+from functools import lru_cache
 import json
 import os
 from typing import Any
 
 from cryptography.fernet import Fernet
 from google_auth_oauthlib.flow import Flow
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
 from packages.db.database import SessionLocal
 from packages.db.models import Secret
@@ -14,6 +17,9 @@ from packages.db.models import Secret
 GOOGLE_TOKEN_NAME = "google_oauth_token"
 GOOGLE_SCOPES = ["https://www.googleapis.com/auth/calendar"]
 
+_token_cache: dict[str, tuple[bytes, dict[str, Any]]] = {}
+_stored_token_names: set[str] = set()
+
 
 class OAuthConfigError(RuntimeError):
     pass
@@ -27,7 +33,12 @@ def _get_secret_key() -> str:
 
 
 def _get_fernet() -> Fernet:
-    return Fernet(_get_secret_key().encode())
+    return _cached_fernet(_get_secret_key())
+
+
+@lru_cache(maxsize=4)
+def _cached_fernet(key: str) -> Fernet:
+    return Fernet(key.encode())
 
 
 def _build_client_config(redirect_uri: str) -> dict[str, Any]:
@@ -36,6 +47,11 @@ def _build_client_config(redirect_uri: str) -> dict[str, Any]:
     if not client_id or not client_secret:
         raise OAuthConfigError("GOOGLE_CLIENT_ID/GOOGLE_CLIENT_SECRET missing")
 
+    return _cached_client_config(client_id, client_secret, redirect_uri)
+
+
+@lru_cache(maxsize=8)
+def _cached_client_config(client_id: str, client_secret: str, redirect_uri: str) -> dict[str, Any]:
     return {
         "web": {
             "client_id": client_id,
@@ -73,35 +89,53 @@ def save_token(token_data: dict[str, Any], name: str = GOOGLE_TOKEN_NAME) -> Non
     payload = json.dumps(token_data, separators=(",", ":")).encode()
     ciphertext = _get_fernet().encrypt(payload).decode()
 
+    statement = pg_insert(Secret).values(name=name, ciphertext=ciphertext)
+    statement = statement.on_conflict_do_update(
+        index_elements=[Secret.name], set_={"ciphertext": statement.excluded.ciphertext}
+    )
     with SessionLocal() as session:
-        secret = session.query(Secret).filter_by(name=name).one_or_none()
-        if secret is None:
-            secret = Secret(name=name, ciphertext=ciphertext)
-            session.add(secret)
-        else:
-            secret.ciphertext = ciphertext
+        session.execute(statement)
         session.commit()
+    _token_cache.pop(name, None)
+    _stored_token_names.add(name)
 
 
 def load_token(name: str = GOOGLE_TOKEN_NAME) -> dict[str, Any] | None:
     with SessionLocal() as session:
-        secret = session.query(Secret).filter_by(name=name).one_or_none()
-        if secret is None:
-            return None
-        ciphertext = secret.ciphertext.encode()
-
+        stored = session.execute(
+            select(Secret.ciphertext).where(Secret.name == name)
+        ).scalar_one_or_none()
+    if stored is None:
+        return None
+    ciphertext = stored.encode()
+
+    cached = _token_cache.get(name)
+    if cached is not None and cached[0] == ciphertext:
+        return dict(cached[1])
     payload = _get_fernet().decrypt(ciphertext).decode()
-    return json.loads(payload)
+    token_data = json.loads(payload)
+    _token_cache[name] = (ciphertext, token_data)
+    return dict(token_data)
+
+
+def clear_token_cache() -> None:
+    _token_cache.clear()
+    _stored_token_names.clear()
 
 
 def has_token(name: str = GOOGLE_TOKEN_NAME) -> bool:
+    if name in _stored_token_names:
+        return True
     with SessionLocal() as session:
-        return session.query(Secret).filter_by(name=name).count() > 0
+        found = session.execute(
+            select(Secret.id).where(Secret.name == name).limit(1)
+        ).scalar() is not None
+    if found:
+        _stored_token_names.add(name)
+    return found
 
 
 def token_metadata(name: str = GOOGLE_TOKEN_NAME) -> dict[str, Any] | None:
-    with SessionLocal() as session:
-        secret = session.query(Secret).filter_by(name=name).one_or_none()
-        if secret is None:
-            return None
-        return {"name": secret.name}
+    if not has_token(name):
+        return None
+    return {"name": name}
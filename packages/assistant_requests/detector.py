@@ -6,10 +6,14 @@ import re
 import unicodedata
 from typing import Any
 
+from sqlalchemy import exists, select
+
 from packages.agent_core.tools.calendar_tool import CalendarTool
 from packages.db.models import AssistantRequest, MemoryFact, MessageRaw
 from packages.assistant_requests.service import create_or_reopen_request, mark_request_answered
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 class NeedsDetector:
     def __init__(self, session) -> None:
@@ -177,16 +181,15 @@ class NeedsDetector:
 
 
 def _has_fact(session, key: str) -> bool:
-    return (
-        session.query(MemoryFact)
-        .filter(
-            MemoryFact.subject == "user",
-            MemoryFact.key == key,
-            MemoryFact.confidence >= 70,
+    return session.execute(
+        select(
+            exists().where(
+                MemoryFact.subject == "user",
+                MemoryFact.key == key,
+                MemoryFact.confidence >= 70,
+            )
         )
-        .first()
-        is not None
-    )
+    ).scalar()
 
 
 def _build_calendar_auth_prompt() -> str:
@@ -219,6 +222,7 @@ def _mentions_dietetica_for_schedule(folded: str) -> bool:
 
 
 def _fold_text(text: str) -> str:
-    normalized = unicodedata.normalize("NFKD", text)
-    ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
-    return re.sub(r"\s+", " ", ascii_text.lower()).strip()
+    if not text.isascii():
+        normalized = unicodedata.normalize("NFKD", text)
+        text = normalized.encode("ascii", "ignore").decode("ascii")
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
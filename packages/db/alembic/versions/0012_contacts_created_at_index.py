@@ -0,0 +1,22 @@
+"""add contacts created_at index
+
+Revision ID: 0012_contacts_created_at
+Revises: 0011_habits_block11
+Create Date: 2025-01-12 00:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0012_contacts_created_at"
+down_revision = "0011_habits_block11"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_contacts_created_at", "contacts", ["created_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_contacts_created_at", table_name="contacts")
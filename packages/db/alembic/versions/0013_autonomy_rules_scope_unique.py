@@ -0,0 +1,34 @@
+"""make autonomy_rules scope unique
+
+Revision ID: 0013_autonomy_scope_unique
+Revises: 0012_contacts_created_at
+Create Date: 2025-01-13 00:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0013_autonomy_scope_unique"
+down_revision = "0012_contacts_created_at"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        DELETE FROM autonomy_rules
+        WHERE id NOT IN (
+            SELECT DISTINCT ON (scope) id
+            FROM autonomy_rules
+            ORDER BY scope, created_at DESC, id DESC
+        )
+        """
+    )
+    op.drop_index("ix_autonomy_rules_scope", table_name="autonomy_rules")
+    op.create_index("ix_autonomy_rules_scope", "autonomy_rules", ["scope"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("ix_autonomy_rules_scope", table_name="autonomy_rules")
+    op.create_index("ix_autonomy_rules_scope", "autonomy_rules", ["scope"], unique=False)
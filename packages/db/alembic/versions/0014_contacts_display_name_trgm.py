@@ -0,0 +1,32 @@
+"""add trigram index on contacts display_name
+
+Revision ID: 0014_contacts_name_trgm
+Revises: 0013_autonomy_scope_unique
+Create Date: 2025-01-14 00:00:00.000000
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "0014_contacts_name_trgm"
+down_revision = "0013_autonomy_scope_unique"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    available = op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm'")
+    ).scalar()
+    if not available:
+        return
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_contacts_display_name_trgm "
+        "ON contacts USING gin (display_name gin_trgm_ops)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_contacts_display_name_trgm")
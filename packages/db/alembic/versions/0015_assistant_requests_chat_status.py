@@ -0,0 +1,25 @@
+"""add chat/status index on assistant_requests
+
+Revision ID: 0015_requests_chat_status
+Revises: 0014_contacts_name_trgm
+Create Date: 2025-01-15 00:00:00.000000
+"""
+
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = "0015_requests_chat_status"
+down_revision = "0014_contacts_name_trgm"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.execute(
+        "CREATE INDEX IF NOT EXISTS ix_assistant_requests_chat_status "
+        "ON assistant_requests ((context ->> 'chat_id'), status)"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_assistant_requests_chat_status")
@@ -1,6 +1,9 @@
 import os
+from typing import Callable
 
-from sqlalchemy import create_engine
+import orjson
+from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 
@@ -21,5 +24,47 @@ class Base(DeclarativeBase):
     pass
 
 
-engine = create_engine(get_database_url(), pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
\ No newline at end of file
+def _json_dumps(value) -> bytes:
+    return orjson.dumps(value, option=orjson.OPT_NON_STR_KEYS)
+
+
+engine = create_engine(
+    get_database_url(),
+    pool_size=20,
+    max_overflow=30,
+    pool_pre_ping=True,
+    pool_recycle=1800,
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
+)
+SessionLocal = sessionmaker(bind=engine, autoflush=False, autocommit=False)
+
+_commit_flag_hooks: dict[str, list[Callable[[], None]]] = {}
+
+
+def on_commit_flag(flag: str, callback: Callable[[], None]) -> None:
+    _commit_flag_hooks.setdefault(flag, []).append(callback)
+
+
+@event.listens_for(SessionLocal, "after_commit")
+def _run_commit_flag_hooks(session) -> None:
+    for flag, callbacks in _commit_flag_hooks.items():
+        if session.info.pop(flag, False):
+            for callback in callbacks:
+                callback()
+
+
+@event.listens_for(SessionLocal, "after_rollback")
+def _discard_commit_flags(session) -> None:
+    for flag in _commit_flag_hooks:
+        session.info.pop(flag, None)
+
+async_engine = create_async_engine(
+    get_database_url(),
+    pool_size=20,
+    max_overflow=10,
+    pool_pre_ping=True,
+    json_serializer=_json_dumps,
+    json_deserializer=orjson.loads,
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
@@ -41,7 +41,7 @@ class Contact(Base):
     preferred_channel: Mapped[str] = mapped_column(Text, nullable=False, default="whatsapp")
     allow_auto_reply: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
     created_at: Mapped[datetime] = mapped_column(
-        DateTime(timezone=True), server_default=func.now(), nullable=False
+        DateTime(timezone=True), server_default=func.now(), nullable=False, index=True
     )
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False
@@ -64,7 +64,7 @@ class AutonomyRule(Base):
     __tablename__ = "autonomy_rules"
 
     id: Mapped[int] = mapped_column(BigInteger, primary_key=True)
-    scope: Mapped[str] = mapped_column(Text, nullable=False)
+    scope: Mapped[str] = mapped_column(Text, nullable=False, unique=True, index=True)
     mode: Mapped[str] = mapped_column(Text, nullable=False)
     until_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True), nullable=True)
     created_at: Mapped[datetime] = mapped_column(
@@ -1,7 +1,11 @@
 from __future__ import annotations
 
+from typing import TYPE_CHECKING
+
 from packages.db.models import CoachingProfile, Habit
-from packages.llm.text_client import TextLlmClient
+
+if TYPE_CHECKING:
+    from packages.llm.text_client import TextLlmClient
 
 
 def build_nudge_message(
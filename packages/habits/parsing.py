@@ -20,6 +20,10 @@ DAY_MAP = {
     "dom": 6,
 }
 
+_TARGET_PER_WEEK_RE = re.compile(r"(\d{1,2})\s*veces\s*por\s*semana")
+_DAY_RE = re.compile(r"\b(" + "|".join(DAY_MAP) + r")\b")
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 def parse_habit_text(text: str) -> dict[str, object]:
     folded = _fold(text)
@@ -40,7 +44,7 @@ def parse_habit_text(text: str) -> dict[str, object]:
 
 
 def _parse_target_per_week(folded: str) -> int | None:
-    match = re.search(r"(\d{1,2})\s*veces\s*por\s*semana", folded)
+    match = _TARGET_PER_WEEK_RE.search(folded)
     if not match:
         return None
     value = int(match.group(1))
@@ -50,14 +54,11 @@ def _parse_target_per_week(folded: str) -> int | None:
 
 
 def _parse_days_of_week(folded: str) -> list[int] | None:
-    found: list[int] = []
-    for key, idx in DAY_MAP.items():
-        if re.search(rf"\\b{re.escape(key)}\\b", folded):
-            found.append(idx)
+    found = {DAY_MAP[match.group(1)] for match in _DAY_RE.finditer(folded)}
     if not found:
         return None
-    return sorted(set(found))
+    return sorted(found)
 
 
 def _fold(text: str) -> str:
-    return re.sub(r"\s+", " ", text.lower()).strip()
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
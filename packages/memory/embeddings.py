@@ -1,11 +1,15 @@
 from __future__ import annotations
 
+from collections import OrderedDict
+from functools import lru_cache
 import hashlib
 import os
 import random
+import threading
 from typing import Protocol
 
 EMBEDDING_DIM = 384
+EMBEDDING_CACHE_SIZE = 1024
 
 
 class EmbeddingProvider(Protocol):
@@ -45,21 +49,39 @@ class SentenceTransformerProvider:
         from sentence_transformers import SentenceTransformer
 
         self.model = SentenceTransformer(model_name)
+        self._cache: OrderedDict[str, list[float]] = OrderedDict()
+        self._lock = threading.Lock()
 
     def is_available(self) -> bool:
         return True
 
     def embed_texts(self, texts: list[str]) -> list[list[float]]:
-        vectors = self.model.encode(texts, normalize_embeddings=True)
-        return [vector.tolist() for vector in vectors]
+        with self._lock:
+            found = {text: self._cache[text] for text in texts if text in self._cache}
+        missing = list(dict.fromkeys(text for text in texts if text not in found))
+        if missing:
+            vectors = self.model.encode(missing, normalize_embeddings=True)
+            found.update((text, vector.tolist()) for text, vector in zip(missing, vectors))
+        with self._lock:
+            for text in dict.fromkeys(texts):
+                self._cache[text] = found[text]
+                self._cache.move_to_end(text)
+            while len(self._cache) > EMBEDDING_CACHE_SIZE:
+                self._cache.popitem(last=False)
+        return [found[text] for text in texts]
 
 
 def get_embedding_provider() -> EmbeddingProvider:
     mode = os.getenv("EMBEDDINGS_MODE", "off").lower()
+    model_name = os.getenv("EMBEDDINGS_MODEL", "all-MiniLM-L6-v2")
+    return _load_embedding_provider(mode, model_name)
+
+
+@lru_cache(maxsize=4)
+def _load_embedding_provider(mode: str, model_name: str) -> EmbeddingProvider:
     if mode == "fake":
         return FakeEmbeddingProvider()
     if mode == "local":
-        model_name = os.getenv("EMBEDDINGS_MODEL", "all-MiniLM-L6-v2")
         try:
             return SentenceTransformerProvider(model_name)
         except Exception:
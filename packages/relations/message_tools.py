@@ -4,10 +4,12 @@ import re
 import unicodedata
 from typing import Any
 
-from apps.api.app.services.waha_client import WahaClient
+from apps.api.app.services.waha_client import WahaClient, outbound_raw_payload
 from packages.db.database import SessionLocal
 from packages.db.models import MessageRaw
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 def build_reply_draft(incoming_text: str, contact_name: str | None) -> str:
     name = contact_name or "Hola"
@@ -31,13 +33,6 @@ def send_message_and_store(chat_id: str, text: str) -> tuple[int, dict[str, Any]
     except Exception as exc:  # pragma: no cover - best-effort logging
         error = str(exc)
 
-    raw_payload: dict[str, Any] = {
-        "request": {"chatId": chat_id, "text": text},
-        "response": response_payload,
-    }
-    if error:
-        raw_payload["error"] = error
-
     with SessionLocal() as session:
         outbound = MessageRaw(
             direction="outbound",
@@ -45,7 +40,7 @@ def send_message_and_store(chat_id: str, text: str) -> tuple[int, dict[str, Any]
             chat_id=chat_id,
             sender_id=None,
             body=text,
-            raw_payload=raw_payload,
+            raw_payload=outbound_raw_payload(response_payload, error),
         )
         session.add(outbound)
         session.commit()
@@ -61,6 +56,7 @@ def _mentions_schedule(folded: str) -> bool:
 
 
 def _fold(text: str) -> str:
-    normalized = unicodedata.normalize("NFKD", text)
-    ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
-    return re.sub(r"\s+", " ", ascii_text.lower()).strip()
+    if not text.isascii():
+        normalized = unicodedata.normalize("NFKD", text)
+        text = normalized.encode("ascii", "ignore").decode("ascii")
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
@@ -4,6 +4,9 @@ from dataclasses import dataclass
 import re
 import unicodedata
 
+_WHITESPACE_RE = re.compile(r"\s+")
+_PUNCT_RE = re.compile(r"[^\w\s]")
+
 
 @dataclass(frozen=True)
 class MessageSafety:
@@ -105,10 +108,11 @@ def _mentions_payment(folded: str) -> bool:
 
 
 def _fold(text: str) -> str:
-    normalized = unicodedata.normalize("NFKD", text)
-    ascii_text = normalized.encode("ascii", "ignore").decode("ascii")
-    return re.sub(r"\s+", " ", ascii_text.lower()).strip()
+    if not text.isascii():
+        normalized = unicodedata.normalize("NFKD", text)
+        text = normalized.encode("ascii", "ignore").decode("ascii")
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
 
 
 def _strip_punct(text: str) -> str:
-    return re.sub(r"[^\w\s]", "", text).strip()
+    return _PUNCT_RE.sub("", text).strip()
@@ -6,6 +6,8 @@ import re
 
 from packages.db.models import ConversationEvent, ConversationThread
 
+_WHITESPACE_RE = re.compile(r"\s+")
+
 
 @dataclass
 class ThreadUpdate:
@@ -106,7 +108,7 @@ def _status_after_outbound(current: str, kind: str) -> str:
 
 
 def _summarize(text: str) -> str:
-    cleaned = re.sub(r"\s+", " ", text.strip())
+    cleaned = _WHITESPACE_RE.sub(" ", text.strip())
     if len(cleaned) > 140:
         return cleaned[:137] + "..."
     return cleaned
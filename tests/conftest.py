@@ -7,6 +7,11 @@ from alembic import command
 from alembic.config import Config
 from sqlalchemy import text
 
+from apps.api.app.routers.webhooks import invalidate_user_chat_id_cache
+from apps.worker.app.proactive import clear_proactive_cache
+from packages.agent_core.core import clear_config_cache, clear_plan_cache
+from packages.agent_core.tools.calendar_tool import flush_tool_runs
+from packages.agent_core.tools.google_oauth import clear_token_cache
 from packages.db.database import SessionLocal, get_database_url
 
 
@@ -24,6 +29,7 @@ def apply_migrations() -> None:
 
 @pytest.fixture(autouse=True)
 def clean_db() -> None:
+    flush_tool_runs()
     with SessionLocal() as session:
         session.execute(
             text(
@@ -31,3 +37,8 @@ def clean_db() -> None:
             )
         )
         session.commit()
+    invalidate_user_chat_id_cache()
+    clear_proactive_cache()
+    clear_plan_cache()
+    clear_config_cache()
+    clear_token_cache()
@@ -1,7 +1,9 @@
+from datetime import datetime, timedelta
+
 import packages.agent_core.core as core
 from packages.agent_core.core import handle_incoming_message
 from packages.db.database import SessionLocal
-from packages.db.models import AutonomyRule, ConversationState
+from packages.db.models import AutonomyRule, Contact, ConversationState, SystemConfig
 
 
 def test_agent_asks_duration() -> None:
@@ -23,7 +25,7 @@ def test_agent_asks_duration() -> None:
 
 def test_agent_plan_confirm_execute(monkeypatch) -> None:
     monkeypatch.setattr(core.CalendarTool, "has_token", lambda self: True)
-    monkeypatch.setattr(core.CalendarTool, "is_free", lambda self, start, end: True)
+    monkeypatch.setattr(core.CalendarTool, "list_busy", lambda self, start, end: [])
 
     created: dict[str, str] = {}
 
@@ -62,7 +64,7 @@ def test_agent_plan_confirm_execute(monkeypatch) -> None:
 
 def test_agent_cancel_clears_state(monkeypatch) -> None:
     monkeypatch.setattr(core.CalendarTool, "has_token", lambda self: True)
-    monkeypatch.setattr(core.CalendarTool, "is_free", lambda self, start, end: True)
+    monkeypatch.setattr(core.CalendarTool, "list_busy", lambda self, start, end: [])
 
     handle_incoming_message(
         chat_id="chat-3",
@@ -126,6 +128,43 @@ def test_autonomy_on_for_calendar() -> None:
         assert rule.until_at is not None
 
 
+def test_autonomy_rule_is_updated_in_place() -> None:
+    for text in ("autonomia on 2 horas para calendario", "autonomia off calendario"):
+        handle_incoming_message(
+            chat_id="chat-6",
+            sender_id="sender-6",
+            text=text,
+            sender_name="Juan",
+            raw_payload={},
+        )
+
+    with SessionLocal() as session:
+        rule = session.query(AutonomyRule).filter_by(scope="calendar_create").one()
+        assert rule.mode == "off"
+        assert rule.until_at is None
+
+
+def test_contact_name_match_treats_wildcards_literally() -> None:
+    with SessionLocal() as session:
+        session.add(Contact(chat_id="ana1@c.us", display_name="Ana_B"))
+        session.add(Contact(chat_id="ana2@c.us", display_name="AnaXB"))
+        session.commit()
+
+    result = handle_incoming_message(
+        chat_id="chat-11",
+        sender_id="sender-11",
+        text="contacto ana_b es cliente",
+        sender_name="Juan",
+        raw_payload={},
+    )
+
+    assert result.reply_text == "Listo, ana_b ahora es cliente."
+    with SessionLocal() as session:
+        labels = dict(session.query(Contact.chat_id, Contact.trust_label))
+        assert labels["ana1@c.us"] == "client"
+        assert labels["ana2@c.us"] != "client"
+
+
 def test_autonomy_status() -> None:
     result = handle_incoming_message(
         chat_id="chat-7",
@@ -138,16 +177,31 @@ def test_autonomy_status() -> None:
     assert "Autonomia" in result.reply_text
 
 
+def test_proactive_status_sees_new_focus_mode() -> None:
+    def send(text: str) -> str:
+        return handle_incoming_message(
+            chat_id="chat-7",
+            sender_id="sender-7",
+            text=text,
+            sender_name="Juan",
+            raw_payload={},
+        ).reply_text
+
+    assert "Modo proactivo: normal" in send("status proactivo")
+    send("modo foco 2 horas")
+    assert "Modo proactivo: foco" in send("status proactivo")
+
+
 def test_agent_conflict_proposes_alternatives(monkeypatch) -> None:
     monkeypatch.setattr(core.CalendarTool, "has_token", lambda self: True)
 
     calls: list[datetime] = []
 
-    def fake_is_free(self, start, end):
+    def fake_list_busy(self, start, end):
         calls.append(start)
-        return len(calls) > 1
+        return [(start, start + timedelta(minutes=15))]
 
-    monkeypatch.setattr(core.CalendarTool, "is_free", fake_is_free)
+    monkeypatch.setattr(core.CalendarTool, "list_busy", fake_list_busy)
 
     result = handle_incoming_message(
         chat_id="chat-5",
@@ -164,3 +218,29 @@ def test_agent_conflict_proposes_alternatives(monkeypatch) -> None:
         assert state is not None
         assert state.pending_question_json["type"] == "conflict_choice"
         assert len(state.pending_question_json["options"]) == 2
+        first_option = datetime.fromtimestamp(
+            state.pending_question_json["options"][0]["start_ts"], core.TIMEZONE
+        )
+        assert first_option == calls[0] + timedelta(minutes=30)
+    assert len(calls) == 1
+
+
+def test_stored_datetime_reads_epoch_and_legacy_iso():
+    expected = datetime(2025, 1, 1, 10, 0, tzinfo=core.TIMEZONE)
+    assert core._stored_datetime({"start_ts": int(expected.timestamp())}, "start_ts", "start") == expected
+    assert core._stored_datetime({"start": expected.isoformat()}, "start_ts", "start") == expected
+    assert core._stored_datetime({}, "start_ts", "start") is None
+
+
+def test_config_cache_is_cleared_when_config_is_committed() -> None:
+    with SessionLocal() as session:
+        limit = core._get_or_create_config(session).daily_proactive_limit
+        session.commit()
+
+    with SessionLocal() as session:
+        config = session.query(SystemConfig).one()
+        config.daily_proactive_limit = limit + 1
+        session.commit()
+
+    with SessionLocal() as session:
+        assert core._get_or_create_config(session).daily_proactive_limit == limit + 1
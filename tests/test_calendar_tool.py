@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta
 from zoneinfo import ZoneInfo
 
+from packages.agent_core.tools import calendar_tool as calendar_tool_module
 from packages.agent_core.tools.calendar_tool import CalendarTool
 
 
@@ -24,13 +25,26 @@ class _FakeEvents:
         return _FakeRequest(self._insert_response)
 
 
+class _FakeFreeBusy:
+    def __init__(self, busy):
+        self._busy = busy
+
+    def query(self, body):
+        calendar_id = body["items"][0]["id"]
+        return _FakeRequest({"calendars": {calendar_id: {"busy": self._busy}}})
+
+
 class _FakeService:
-    def __init__(self, list_items=None, insert_response=None):
+    def __init__(self, list_items=None, insert_response=None, busy=None):
         self._events = _FakeEvents(list_items or [], insert_response or {})
+        self._freebusy = _FakeFreeBusy(busy or [])
 
     def events(self):
         return self._events
 
+    def freebusy(self):
+        return self._freebusy
+
 
 def test_is_free_false_when_event(monkeypatch) -> None:
     tool = CalendarTool()
@@ -41,4 +55,50 @@ def test_is_free_false_when_event(monkeypatch) -> None:
     start = datetime(2025, 1, 1, 10, 0, tzinfo=ZoneInfo("America/Argentina/Buenos_Aires"))
     end = start + timedelta(minutes=30)
 
-    assert tool.is_free(start, end) is False
\ No newline at end of file
+    assert tool.is_free(start, end) is False
+
+
+def test_list_busy_merges_overlapping_periods(monkeypatch) -> None:
+    tool = CalendarTool(log_runs=False)
+    busy = [
+        {"start": "2025-01-01T15:00:00Z", "end": "2025-01-01T16:00:00Z"},
+        {"start": "2025-01-01T13:00:00Z", "end": "2025-01-01T14:00:00Z"},
+        {"start": "2025-01-01T13:30:00Z", "end": "2025-01-01T14:30:00Z"},
+    ]
+    monkeypatch.setattr(CalendarTool, "_get_service", lambda self: _FakeService(busy=busy))
+
+    start = datetime(2025, 1, 1, 10, 0, tzinfo=ZoneInfo("America/Argentina/Buenos_Aires"))
+    intervals = tool.list_busy(start, start + timedelta(hours=4))
+
+    assert [(s.hour, s.minute, e.hour, e.minute) for s, e in intervals] == [
+        (13, 0, 14, 30),
+        (15, 0, 16, 0),
+    ]
+
+
+def test_service_is_built_once_per_access_token(monkeypatch) -> None:
+    token = {
+        "token": "access-1",
+        "refresh_token": "refresh",
+        "client_id": "client",
+        "client_secret": "secret",
+        "expiry": "2099-01-01T00:00:00Z",
+    }
+    builds: list[str] = []
+
+    def fake_build(*args, credentials, **kwargs):
+        builds.append(credentials.token)
+        return _FakeService()
+
+    monkeypatch.setattr(calendar_tool_module, "load_token", lambda: dict(token))
+    monkeypatch.setattr(calendar_tool_module, "build", fake_build)
+
+    tool = CalendarTool(log_runs=False)
+    start = datetime(2025, 1, 1, 10, 0, tzinfo=ZoneInfo("America/Argentina/Buenos_Aires"))
+    tool.list_events(start, start + timedelta(hours=1))
+    tool.list_busy(start, start + timedelta(hours=1))
+    assert builds == ["access-1"]
+
+    token["token"] = "access-2"
+    tool.list_events(start, start + timedelta(hours=1))
+    assert builds == ["access-1", "access-2"]
@@ -1,6 +1,8 @@
+from cryptography.fernet import Fernet
 from fastapi.testclient import TestClient
 
 from apps.api.app.main import app
+from packages.agent_core.tools.google_oauth import has_token, load_token, save_token
 
 client = TestClient(app)
 
@@ -15,4 +17,27 @@ def test_google_auth_start_returns_url(monkeypatch) -> None:
 
     data = response.json()
     assert "auth_url" in data
-    assert "accounts.google.com" in data["auth_url"]
\ No newline at end of file
+    assert "accounts.google.com" in data["auth_url"]
+
+
+def test_load_token_decrypts_once_per_ciphertext(monkeypatch) -> None:
+    monkeypatch.setenv("SECRET_KEY", Fernet.generate_key().decode())
+    calls = {"decrypt": 0}
+    original_decrypt = Fernet.decrypt
+
+    def counting_decrypt(self, token, *args):
+        calls["decrypt"] += 1
+        return original_decrypt(self, token, *args)
+
+    monkeypatch.setattr(Fernet, "decrypt", counting_decrypt)
+
+    assert has_token() is False
+    save_token({"token": "first"})
+    assert has_token() is True
+    assert load_token() == {"token": "first"}
+    assert load_token() == {"token": "first"}
+    assert calls["decrypt"] == 1
+
+    save_token({"token": "second"})
+    assert load_token() == {"token": "second"}
+    assert calls["decrypt"] == 2
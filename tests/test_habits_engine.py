@@ -4,6 +4,7 @@ from zoneinfo import ZoneInfo
 from packages.db.database import SessionLocal
 from packages.db.models import CoachingProfile, Habit, HabitNudge
 from packages.habits.engine import HabitEngine, STATUS_DONE, STATUS_SKIPPED
+from packages.habits.parsing import parse_habit_text
 from packages.habits.selector import NudgeStrategySelector
 
 TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
@@ -92,3 +93,12 @@ def test_log_done_and_skip() -> None:
         log2 = engine.habit_status_today(habit2.id, today=now.date())
         assert log2 is not None
         assert log2.status == STATUS_SKIPPED
+
+
+def test_parse_habit_text_schedules() -> None:
+    assert parse_habit_text("Gym lunes y jueves")["days_of_week"] == [0, 3]
+    assert parse_habit_text("Gym lunes y jueves")["schedule_type"] == "scheduled"
+    weekly = parse_habit_text("Correr 3 veces por semana")
+    assert weekly["schedule_type"] == "weekly"
+    assert weekly["target_per_week"] == 3
+    assert parse_habit_text("Leer")["schedule_type"] == "daily"
@@ -10,6 +10,8 @@ TIMEZONE = ZoneInfo("America/Argentina/Buenos_Aires")
 
 
 class _FakeCalendarTool:
+    calendar_id = "primary"
+
     def list_events(self, time_min, time_max):
         return []
 
@@ -149,3 +151,41 @@ def test_habit_rate_limit_digest(monkeypatch) -> None:
     with SessionLocal() as session:
         event = session.query(ProactiveEvent).filter_by(trigger_type="habit_window").one()
         assert event.decision == "digested"
+
+
+def test_habit_rate_limit_skips_llm(monkeypatch) -> None:
+    monkeypatch.setenv("USER_CHAT_ID", "123@c.us")
+    now = datetime(2025, 1, 5, 12, 0, tzinfo=TIMEZONE)
+    _seed_habit(window_start=time(11, 0), window_end=time(12, 30))
+
+    with SessionLocal() as session:
+        config = SystemConfig(
+            quiet_hours_start=time(0, 0),
+            quiet_hours_end=time(9, 30),
+            strong_window_start=time(11, 0),
+            strong_window_end=time(19, 0),
+            daily_proactive_limit=0,
+            maybe_cooldown_minutes=240,
+            urgent_threshold=80,
+            maybe_threshold=50,
+            llm_provider="ollama",
+            llm_base_url="http://localhost:11434",
+            llm_model_name="qwen2.5:7b-instruct-q4",
+            llm_temperature=0.3,
+            llm_max_tokens=512,
+            llm_json_mode=True,
+        )
+        session.add(config)
+        session.commit()
+
+    class _FailingLlm:
+        def generate_text(self, system_prompt: str, user_prompt: str) -> str:
+            raise AssertionError("LLM should not be called at the daily limit")
+
+    run_proactive_tick(now=now, calendar_tool=_FakeCalendarTool(), llm_client=_FailingLlm())
+
+    with SessionLocal() as session:
+        event = session.query(ProactiveEvent).filter_by(trigger_type="habit_window").one()
+        assert event.decision == "digested"
+        nudge = session.query(HabitNudge).one()
+        assert "Caminar" in nudge.message_text
@@ -26,11 +26,11 @@ def test_llm_executes_calendar_action(monkeypatch) -> None:
     )
 
     monkeypatch.setattr(
-        "packages.agent_core.core.LlmClient.generate_structured",
+        "packages.llm.client.LlmClient.generate_structured",
         lambda self, system_prompt, user_input, context: planner_output,
     )
     monkeypatch.setattr(
-        "packages.agent_core.core.execute_tool",
+        "packages.llm.tools_registry.execute_tool",
         lambda tool_name, tool_input, calendar_tool=None, message_sender=None: {
             "htmlLink": "http://example.com"
         },
@@ -72,7 +72,7 @@ def test_llm_requires_confirmation_sets_pending(monkeypatch) -> None:
     )
 
     monkeypatch.setattr(
-        "packages.agent_core.core.LlmClient.generate_structured",
+        "packages.llm.client.LlmClient.generate_structured",
         lambda self, system_prompt, user_input, context: planner_output,
     )
 
@@ -89,3 +89,48 @@ def test_llm_requires_confirmation_sets_pending(monkeypatch) -> None:
     with SessionLocal() as session:
         state = session.get(ConversationState, "chat-2")
         assert state.pending_action_json is not None
+
+
+def test_llm_plan_is_reused_for_repeated_message(monkeypatch) -> None:
+    start = datetime(2025, 1, 1, 10, 0).isoformat()
+    end = datetime(2025, 1, 1, 11, 0).isoformat()
+    planner_output = PlannerOutput(
+        intent="calendar_create",
+        reply="Evento creado.",
+        questions=[],
+        actions=[
+            PlannedAction(
+                tool="calendar.create_event",
+                input={"title": "Reunion", "start": start, "end": end},
+                risk_level="low",
+                rationale="pedido usuario",
+                requires_confirmation=False,
+            )
+        ],
+        evidence_needed=[],
+    )
+    calls = []
+
+    def fake_generate(self, system_prompt, user_input, context):
+        calls.append(user_input)
+        return planner_output
+
+    monkeypatch.setattr("packages.llm.client.LlmClient.generate_structured", fake_generate)
+    monkeypatch.setattr(
+        "packages.llm.tools_registry.execute_tool",
+        lambda tool_name, tool_input, calendar_tool=None, message_sender=None: {
+            "htmlLink": "http://example.com"
+        },
+    )
+
+    for _ in range(2):
+        reply = handle_incoming_message(
+            chat_id="chat-3",
+            sender_id="sender-3",
+            text="crear evento manana",
+            sender_name="Juan",
+            raw_payload={},
+        )
+        assert "http://example.com" in reply.reply_text
+
+    assert calls == ["crear evento manana"]
@@ -1,6 +1,9 @@
+import threading
+
 import pytest
 from sqlalchemy import text
 
+import packages.agent_core.core as core
 from packages.agent_core.core import handle_incoming_message
 from packages.db.database import SessionLocal
 from packages.db.models import MemoryChunk, MemoryFact, MessageRaw
@@ -92,6 +95,40 @@ def test_evidence_gate_fact_present() -> None:
     assert "Peluqueria Central" in reply.reply_text
 
 
+def test_schedule_with_fact_checks_availability_in_background(monkeypatch) -> None:
+    monkeypatch.setattr(core.CalendarTool, "has_token", lambda self: True)
+    threads: list[str] = []
+
+    def fake_list_busy(self, start, end):
+        threads.append(threading.current_thread().name)
+        return []
+
+    monkeypatch.setattr(core.CalendarTool, "list_busy", fake_list_busy)
+    with SessionLocal() as session:
+        session.add(
+            MemoryFact(
+                subject="user",
+                key="peluqueria_default",
+                value="Peluqueria Central",
+                confidence=80,
+                source_ref="manual",
+            )
+        )
+        session.commit()
+
+    reply = handle_incoming_message(
+        chat_id="chat-3",
+        sender_id="sender-3",
+        text="agendame turno peluqueria en el lugar de siempre manana 10 60 min",
+        sender_name="Juan",
+        raw_payload={},
+    )
+
+    assert "en Peluqueria Central por 60 min" in reply.reply_text
+    assert len(threads) == 1
+    assert threads[0].startswith("agent-io")
+
+
 def test_ingest_and_search_end_to_end(monkeypatch) -> None:
     monkeypatch.setenv("EMBEDDINGS_MODE", "off")
     with SessionLocal() as session:
@@ -1,5 +1,7 @@
 from datetime import datetime, timedelta, timezone
 
+import pytest
+
 from apps.worker.app import proactive as proactive_module
 from apps.worker.app.proactive import (
     TIMEZONE,
@@ -14,10 +16,14 @@ from packages.db.models import AutonomyRule, Contact, ConversationThread, Proact
 
 
 class _FakeCalendarTool:
+    calendar_id = "primary"
+
     def __init__(self, events):
         self._events = events
+        self.calls = 0
 
     def list_events(self, time_min, time_max):
+        self.calls += 1
         return self._events
 
 
@@ -48,7 +54,7 @@ def test_decide_quiet_hours_digest() -> None:
         dedupe_key="calendar:evt-1:tminus60",
         message="msg",
     )
-    decision = decide(candidate, now, _make_config(), "normal", 0, False)
+    decision = decide(candidate, now.time(), _make_config(), "normal", 0, False)
     assert decision.decision == "digested"
     assert decision.reason == "quiet_hours"
 
@@ -64,7 +70,7 @@ def test_decide_focus_digest() -> None:
         dedupe_key="calendar:evt-2:tminus60",
         message="msg",
     )
-    decision = decide(candidate, now, _make_config(), "focus", 0, False)
+    decision = decide(candidate, now.time(), _make_config(), "focus", 0, False)
     assert decision.decision == "digested"
     assert decision.reason == "autonomy_mode"
 
@@ -80,7 +86,7 @@ def test_decide_cooldown_digest() -> None:
         dedupe_key="calendar:evt-3:tminus60",
         message="msg",
     )
-    decision = decide(candidate, now, _make_config(), "normal", 0, True)
+    decision = decide(candidate, now.time(), _make_config(), "normal", 0, True)
     assert decision.decision == "digested"
     assert decision.reason == "cooldown"
 
@@ -97,7 +103,7 @@ def test_decide_rate_limit_digest() -> None:
         message="msg",
     )
     config = _make_config()
-    decision = decide(candidate, now, config, "normal", config.daily_proactive_limit, False)
+    decision = decide(candidate, now.time(), config, "normal", config.daily_proactive_limit, False)
     assert decision.decision == "digested"
     assert decision.reason == "rate_limit"
 
@@ -129,6 +135,35 @@ def test_worker_sends_calendar_maybe(monkeypatch) -> None:
         assert record.decision == "sent"
 
 
+def test_sent_event_survives_later_tick_failure(monkeypatch) -> None:
+    monkeypatch.setenv("USER_CHAT_ID", "123@c.us")
+    now = datetime(2025, 1, 1, 12, 0, tzinfo=TIMEZONE)
+    start = now + timedelta(minutes=50)
+    fake_tool = _FakeCalendarTool([_make_event("evt-8", "Reunion", start, location="Oficina")])
+    monkeypatch.setattr(
+        "apps.api.app.services.waha_client.WahaClient.send_text",
+        lambda self, chat_id, text: {"messageId": "fake"},
+    )
+
+    original_insert = proactive_module._insert_events
+    calls = {"count": 0}
+
+    def flaky_insert(session, event_rows):
+        calls["count"] += 1
+        if calls["count"] > 1:
+            raise RuntimeError("db down")
+        return original_insert(session, event_rows)
+
+    monkeypatch.setattr(proactive_module, "_insert_events", flaky_insert)
+
+    with pytest.raises(RuntimeError):
+        run_proactive_tick(now=now, calendar_tool=fake_tool)
+
+    with SessionLocal() as session:
+        record = session.query(ProactiveEvent).filter_by(entity_id="evt-8").one()
+        assert record.decision == "sent"
+
+
 def test_worker_digests_task_and_sends_digest(monkeypatch) -> None:
     monkeypatch.setenv("USER_CHAT_ID", "123@c.us")
     now = datetime(2025, 1, 1, 20, 0, tzinfo=TIMEZONE)
@@ -168,6 +203,29 @@ def test_worker_digests_task_and_sends_digest(monkeypatch) -> None:
     assert "Tarea: Enviar presupuesto" in sent["text"]
 
 
+def test_digest_reuses_tick_calendar_fetch(monkeypatch) -> None:
+    monkeypatch.setenv("USER_CHAT_ID", "123@c.us")
+    now = datetime(2025, 1, 1, 20, 0, tzinfo=TIMEZONE)
+    start = now + timedelta(minutes=50)
+    fake_tool = _FakeCalendarTool([_make_event("evt-7", "Reunion", start, location="Oficina")])
+
+    sent = {}
+
+    def fake_send(self, chat_id: str, text: str) -> dict:
+        sent["text"] = text
+        return {"messageId": "fake"}
+
+    monkeypatch.setattr(
+        "apps.api.app.services.waha_client.WahaClient.send_text", fake_send
+    )
+
+    run_proactive_tick(now=now, calendar_tool=fake_tool)
+    run_daily_digest(now=now + timedelta(minutes=1), calendar_tool=fake_tool)
+
+    assert fake_tool.calls == 1
+    assert "Evento: Reunion" in sent["text"]
+
+
 def test_focus_command_affects_decisions(monkeypatch) -> None:
     monkeypatch.setenv("USER_CHAT_ID", "123@c.us")
     now = datetime(2025, 1, 1, 12, 0, tzinfo=TIMEZONE)
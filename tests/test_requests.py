@@ -1,5 +1,7 @@
 from datetime import datetime
+from time import monotonic
 
+from apps.api.app.routers import webhooks as webhooks_module
 from apps.worker.app import proactive as proactive_module
 from apps.worker.app.proactive import TIMEZONE, run_daily_digest
 from packages.agent_core.core import handle_incoming_message
@@ -194,6 +196,37 @@ def test_request_answer_creates_fact() -> None:
         assert request.status == "answered"
 
 
+def test_user_chat_id_answer_invalidates_cache_on_commit(monkeypatch) -> None:
+    now = datetime(2025, 1, 1, 12, 0, tzinfo=TIMEZONE)
+    with SessionLocal() as session:
+        request = create_or_reopen_request(
+            session,
+            request_type="missing_preference",
+            key="user_chat_id",
+            prompt="x",
+            context={"chat_id": "chat-9"},
+            priority=55,
+            now=now,
+        )
+        mark_request_asked(session, request, now)
+        session.commit()
+    monkeypatch.setattr(webhooks_module, "_user_chat_id_cache", (monotonic(), None))
+
+    reply = handle_incoming_message(
+        chat_id="chat-9",
+        sender_id="sender-1",
+        text="si este chat",
+        sender_name="Juan",
+        raw_payload={},
+    )
+
+    assert "Listo" in reply.reply_text
+    assert webhooks_module._user_chat_id_cache is None
+    with SessionLocal() as session:
+        fact = session.query(MemoryFact).filter_by(subject="user", key="user_chat_id").one()
+        assert fact.value == "chat-9"
+
+
 def test_digest_includes_requests(monkeypatch) -> None:
     monkeypatch.setenv("USER_CHAT_ID", "123@c.us")
     now = datetime(2025, 1, 1, 20, 0, tzinfo=TIMEZONE)
@@ -1,22 +1,21 @@
 from fastapi.testclient import TestClient
 
 from apps.api.app.main import app
+from apps.api.app.routers import webhooks as webhooks_module
 from packages.db.database import SessionLocal
 from packages.db.models import Contact, MessageRaw
 
-client = TestClient(app)
-
 
 def test_waha_webhook_persists_and_sends(monkeypatch) -> None:
     sent: dict[str, str] = {}
 
-    def fake_send(self, chat_id: str, text: str) -> dict:
+    async def fake_send(self, chat_id: str, text: str) -> dict:
         sent["chat_id"] = chat_id
         sent["text"] = text
         return {"messageId": "fake"}
 
     monkeypatch.setattr(
-        "apps.api.app.services.waha_client.WahaClient.send_text", fake_send
+        "apps.api.app.services.waha_client.WahaClient.send_text_async", fake_send
     )
 
     payload = {
@@ -29,7 +28,8 @@ def test_waha_webhook_persists_and_sends(monkeypatch) -> None:
         },
     }
 
-    response = client.post("/webhooks/waha", json=payload)
+    with TestClient(app) as client:
+        response = client.post("/webhooks/waha", json=payload)
 
     assert response.status_code == 200
     assert sent["chat_id"] == "123@c.us"
@@ -43,3 +43,74 @@ def test_waha_webhook_persists_and_sends(monkeypatch) -> None:
         assert inbound.body == "hola"
         assert outbound.body == "Recibi tu mensaje"
         assert contact.display_name == "Juan"
+
+
+def test_waha_webhook_ignores_redelivered_message(monkeypatch) -> None:
+    sent: list[str] = []
+
+    async def fake_send(self, chat_id: str, text: str) -> dict:
+        sent.append(text)
+        return {"messageId": "fake"}
+
+    monkeypatch.setattr(
+        "apps.api.app.services.waha_client.WahaClient.send_text_async", fake_send
+    )
+
+    payload = {
+        "event": "message",
+        "payload": {
+            "id": "false_123@c.us_ABC",
+            "chatId": "123@c.us",
+            "author": "111@c.us",
+            "body": "hola",
+        },
+    }
+
+    with TestClient(app) as client:
+        assert client.post("/webhooks/waha", json=payload).status_code == 200
+        assert client.post("/webhooks/waha", json=payload).status_code == 200
+
+    assert len(sent) == 1
+    with SessionLocal() as session:
+        inbound_count = session.query(MessageRaw).filter_by(direction="inbound").count()
+        assert inbound_count == 1
+
+
+def test_waha_webhook_processes_redelivery_after_failure(monkeypatch) -> None:
+    sent: list[str] = []
+    calls = {"count": 0}
+
+    async def fake_send(self, chat_id: str, text: str) -> dict:
+        sent.append(text)
+        return {"messageId": "fake"}
+
+    original_upsert = webhooks_module._upsert_contact
+
+    def flaky_upsert(session, chat_id: str, display_name: str | None) -> None:
+        calls["count"] += 1
+        if calls["count"] == 1:
+            raise RuntimeError("db down")
+        original_upsert(session, chat_id, display_name)
+
+    monkeypatch.setattr(
+        "apps.api.app.services.waha_client.WahaClient.send_text_async", fake_send
+    )
+    monkeypatch.setattr(webhooks_module, "_upsert_contact", flaky_upsert)
+
+    payload = {
+        "event": "message",
+        "payload": {
+            "id": "false_123@c.us_DEF",
+            "chatId": "123@c.us",
+            "author": "111@c.us",
+            "body": "hola",
+        },
+    }
+
+    with TestClient(app, raise_server_exceptions=False) as client:
+        assert client.post("/webhooks/waha", json=payload).status_code == 500
+        assert client.post("/webhooks/waha", json=payload).status_code == 200
+
+    assert len(sent) == 1
+    with SessionLocal() as session:
+        assert session.query(MessageRaw).filter_by(direction="inbound").count() == 1
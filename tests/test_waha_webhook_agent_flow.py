@@ -2,11 +2,10 @@ from fastapi.testclient import TestClient
 
 import packages.agent_core.core as core
 from apps.api.app.main import app
+from packages.agent_core.tools.calendar_tool import flush_tool_runs
 from packages.db.database import SessionLocal
 from packages.db.models import ConversationState, MessageRaw, ToolRun
 
-client = TestClient(app)
-
 
 class _FakeRequest:
     def __init__(self, response):
@@ -28,6 +27,11 @@ class _FakeEvents:
         return _FakeRequest(self._insert_response)
 
 
+class _FakeFreeBusy:
+    def query(self, **kwargs):
+        return _FakeRequest({"calendars": {"primary": {"busy": []}}})
+
+
 class _FakeService:
     def __init__(self, list_items=None, insert_response=None):
         self._events = _FakeEvents(list_items or [], insert_response or {})
@@ -35,16 +39,19 @@ class _FakeService:
     def events(self):
         return self._events
 
+    def freebusy(self):
+        return _FakeFreeBusy()
+
 
 def test_waha_webhook_agent_flow(monkeypatch) -> None:
     sent: list[str] = []
 
-    def fake_send(self, chat_id: str, text: str) -> dict:
+    async def fake_send(self, chat_id: str, text: str) -> dict:
         sent.append(text)
         return {"messageId": f"fake-{len(sent)}"}
 
     monkeypatch.setattr(
-        "apps.api.app.services.waha_client.WahaClient.send_text", fake_send
+        "apps.api.app.services.waha_client.WahaClient.send_text_async", fake_send
     )
     monkeypatch.setattr(core.CalendarTool, "has_token", lambda self: True)
     monkeypatch.setattr(
@@ -66,40 +73,42 @@ def test_waha_webhook_agent_flow(monkeypatch) -> None:
         },
     }
 
-    response = client.post("/webhooks/waha", json=payload)
-    assert response.status_code == 200
-
-    duration_payload = {
-        "event": "message",
-        "payload": {
-            "chatId": "555@c.us",
-            "author": "111@c.us",
-            "body": "60",
-            "senderName": "Juan",
-        },
-    }
-
-    response = client.post("/webhooks/waha", json=duration_payload)
-    assert response.status_code == 200
-
-    confirm_payload = {
-        "event": "message",
-        "payload": {
-            "chatId": "555@c.us",
-            "author": "111@c.us",
-            "body": "confirmo",
-            "senderName": "Juan",
-        },
-    }
-
-    response = client.post("/webhooks/waha", json=confirm_payload)
-    assert response.status_code == 200
+    with TestClient(app) as client:
+        response = client.post("/webhooks/waha", json=payload)
+        assert response.status_code == 200
+
+        duration_payload = {
+            "event": "message",
+            "payload": {
+                "chatId": "555@c.us",
+                "author": "111@c.us",
+                "body": "60",
+                "senderName": "Juan",
+            },
+        }
+
+        response = client.post("/webhooks/waha", json=duration_payload)
+        assert response.status_code == 200
+
+        confirm_payload = {
+            "event": "message",
+            "payload": {
+                "chatId": "555@c.us",
+                "author": "111@c.us",
+                "body": "confirmo",
+                "senderName": "Juan",
+            },
+        }
+
+        response = client.post("/webhooks/waha", json=confirm_payload)
+        assert response.status_code == 200
 
     assert len(sent) == 3
     assert "Cuanto dura" in sent[0]
     assert "Confirmas" in sent[1]
     assert "evento creado" in sent[2]
 
+    flush_tool_runs()
     with SessionLocal() as session:
         state = session.get(ConversationState, "555@c.us")
         assert state is not None